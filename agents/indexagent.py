@@ -1,10 +1,9 @@
-import json
-import faiss
-import numpy as np
 import os
 import sys
+import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils.embedding import get_embedding
+from utils.embedding import get_embeddings_cached, get_embedding_cache
+from utils.vector_store import get_vector_store
 from agents.ingestion_agent import read_pdf, read_docx, read_csv, read_pptx, read_txt
 
 
@@ -12,40 +11,41 @@ def handle_index_message(mcp_message):
     payload = mcp_message.payload
     chunks = payload["chunks"]
     source_file = payload["source_file"]
+    # Documents are keyed by absolute path; same-named files elsewhere are separate
+    document = payload.get("source_path") or source_file
     trace_id = mcp_message.trace_id
 
-    # ✅ Generate embeddings using real get_embedding
-    embeddings = [get_embedding(chunk) for chunk in chunks]
-    embeddings_np = np.array(embeddings).astype("float32")
-    print("🔢 embeddings_np.shape:", embeddings_np.shape)
-
-    dim = embeddings_np.shape[1]
+    if not chunks:
+        # A file that used to have content must not keep its old chunks searchable
+        removed = get_vector_store().delete_document(document)
+        print(f"⚠️ No chunks to index from '{source_file}'" + (f", removed {removed} old chunks" if removed else ""))
+        return
 
-    # Load or create FAISS index
-    if os.path.exists("vector_index.faiss"):
-        index = faiss.read_index("vector_index.faiss")
-        print("📂 Loaded existing FAISS index")
-        with open("chunk_metadata.json", "r") as f:
-            metadata = json.load(f)
+    embeddings = payload.get("embeddings")
+    if embeddings is not None and len(embeddings) and embeddings[0] is not None:
+        # ✅ Embeddings were already computed upstream (parallel ingestion)
+        embeddings_np = np.asarray(embeddings, dtype="float32")
     else:
-        index = faiss.IndexFlatL2(dim)
-        metadata = []
-        print("📦 Created new FAISS index")
-
-    index.add(embeddings_np)
+        # ✅ Generate embeddings in batches, encoding only cache misses
+        embeddings_np = get_embeddings_cached(chunks)
+        print("🗃️ Embedding cache:", get_embedding_cache().stats())
+    print("🔢 embeddings_np.shape:", embeddings_np.shape)
 
-    for chunk in chunks:
-        metadata.append({
-            "chunk": chunk,
-            "source_file": source_file
-        })
+    dim = embeddings_np.shape[1]
 
-    faiss.write_index(index, "vector_index.faiss")
-    with open("chunk_metadata.json", "w") as f:
-        json.dump(metadata, f)
+    # Write to the shared, resident vector store (persists to disk). Chunks
+    # from an earlier version of the same file are swapped out in the same write.
+    store = get_vector_store()
+    chunk_meta = payload.get("chunk_meta") or [{} for _ in chunks]
+    replaced = store.replace_document(document, embeddings_np, [
+        {"chunk": chunk, "source_file": source_file, **meta}
+        for chunk, meta in zip(chunks, chunk_meta)
+    ])
 
+    if replaced:
+        print(f"♻️ Replaced {replaced} old chunks of '{source_file}'")
     print(f"✅ Indexed {len(chunks)} new chunks from '{source_file}'")
-    print(f"📊 Total vectors in FAISS index: {index.ntotal} | Dimension: {dim}")
+    print(f"📊 Total vectors in FAISS index: {store.ntotal} | Dimension: {dim}")
 
 # --------------------------
 # 🚀 Read doc.txt internally and index
@@ -76,7 +76,8 @@ def simulate_from_file(file_path):
         "trace_id": "trace-generic-file",
         "payload": {
             "chunks": raw_chunks,
-            "source_file": os.path.basename(file_path)
+            "source_file": os.path.basename(file_path),
+            "source_path": os.path.abspath(file_path)
         }
     }
 
@@ -1,30 +1,88 @@
 import os
-import fitz  # PyMuPDF
-import pandas as pd
-import docx
-from pptx import Presentation
+import csv
 from core_mcp.mcp import MCPMessage
+from utils.chunking import (
+    HAS_TIKTOKEN, CHUNK_MAX_TOKENS, CHUNK_OVERLAP, CHARS_PER_TOKEN,
+    chunk_stream, strategy_name,
+    stream_chunks_tiktoken, stream_chunks_line,
+    split_into_chunks_tiktoken, split_into_chunks_line,
+)
 
-# Optional: use tiktoken for better chunking
-try:
-    import tiktoken
-    HAS_TIKTOKEN = True
-except ImportError:
-    HAS_TIKTOKEN = False
+CSV_ROWS_PER_CHUNK = 20
+CSV_CHUNK_TOKENS = CHUNK_MAX_TOKENS
+
+def chunker_settings():
+    # Anything that changes the produced chunks must be listed here, it is
+    # part of the fingerprint stored in the ingestion manifest.
+    return {
+        "strategy": strategy_name(),
+        "max_tokens": CHUNK_MAX_TOKENS,
+        "overlap": CHUNK_OVERLAP,
+        "csv_rows_per_chunk": CSV_ROWS_PER_CHUNK,
+        "csv_chunk_tokens": CSV_CHUNK_TOKENS,
+        "csv_format": "stream-pipe",
+    }
+
+# ---------- streaming readers ----------
+# Each yields (page_number, text) segments so documents never have to be
+# held as one string. page_number is None for formats without pages.
+# Parser libraries are imported inside the readers: a run that only sees
+# PDFs never pays for python-docx, python-pptx or pandas.
+
+TXT_SEGMENT_CHARS = 64 * 1024
+
+def iter_pdf_pages(path):
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        for page_num, page in enumerate(doc, 1):
+            yield page_num, page.get_text()
+
+def iter_docx_paragraphs(path):
+    import docx
+
+    doc = docx.Document(path)
+    for para in doc.paragraphs:
+        if para.text.strip():
+            yield None, para.text
+
+def iter_pptx_slides(path):
+    from pptx import Presentation
+
+    prs = Presentation(path)
+    for slide_num, slide in enumerate(prs.slides, 1):
+        content = []
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                content.append(shape.text.strip())
+        if content:
+            yield slide_num, f"Slide {slide_num}: " + " ".join(content)
+
+def iter_txt_blocks(path, block_chars=TXT_SEGMENT_CHARS):
+    with open(path, "r", encoding="utf-8") as f:
+        block, size = [], 0
+        for line in f:
+            block.append(line)
+            size += len(line)
+            if size >= block_chars:
+                yield None, "".join(block)
+                block, size = [], 0
+        if block:
+            yield None, "".join(block)
 
 def read_pdf(path):
-    doc = fitz.open(path)
-    return "\n".join([page.get_text() for page in doc])
+    return "\n".join(text for _, text in iter_pdf_pages(path))
 
 def read_docx(path):
-    doc = docx.Document(path)
-    return "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+    return "\n".join(text for _, text in iter_docx_paragraphs(path))
 
 def read_csv(path):
+    import pandas as pd
+
     df = pd.read_csv(path)
     return df
 
-def chunk_csv_dataframe(df, rows_per_chunk=20):
+def chunk_csv_dataframe(df, rows_per_chunk=CSV_ROWS_PER_CHUNK):
     chunks = []
     for start in range(0, len(df), rows_per_chunk):
         chunk_df = df.iloc[start:start+rows_per_chunk]
@@ -33,48 +91,52 @@ def chunk_csv_dataframe(df, rows_per_chunk=20):
             chunks.append(chunk_str)
     return chunks
 
+def iter_csv_chunks(path, rows_per_chunk=CSV_ROWS_PER_CHUNK, token_budget=CSV_CHUNK_TOKENS):
+    """
+    Stream a CSV file into chunks without loading it into a DataFrame.
+    Every chunk starts with the header line and holds at most rows_per_chunk
+    rows, fewer if the estimated token count would exceed token_budget.
+    Yields {"chunk", "row_start", "row_end"} (1-based data row numbers).
+    """
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        header_line = " | ".join(header)
+        budget_chars = token_budget * CHARS_PER_TOKEN - len(header_line)
+
+        lines, size, row_start = [], 0, 1
+        for row_num, row in enumerate(reader, 1):
+            line = " | ".join(row)
+            if lines and (len(lines) >= rows_per_chunk or size + len(line) > budget_chars):
+                yield {"chunk": header_line + "\n" + "\n".join(lines), "row_start": row_start, "row_end": row_num - 1}
+                lines, size, row_start = [], 0, row_num
+            if line.strip(" |"):
+                lines.append(line)
+                size += len(line) + 1
+        if lines:
+            yield {"chunk": header_line + "\n" + "\n".join(lines), "row_start": row_start, "row_end": row_num}
+
 def read_pptx(path):
-    prs = Presentation(path)
-    slides = []
-    for slide_num, slide in enumerate(prs.slides, 1):
-        content = []
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text.strip():
-                content.append(shape.text.strip())
-        if content:
-            slides.append(f"Slide {slide_num}: " + " ".join(content))
-    return "\n".join(slides)
+    return "\n".join(text for _, text in iter_pptx_slides(path))
 
 def read_txt(path):
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
-def split_into_chunks_tiktoken(text, max_tokens=300, overlap=50):
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
-    chunks = []
-    start = 0
-    while start < len(tokens):
-        end = min(start + max_tokens, len(tokens))
-        chunk = enc.decode(tokens[start:end])
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        start += max_tokens - overlap
-    return chunks
-
-def split_into_chunks_line(text, max_tokens=300):
-    lines = text.split("\n")
-    chunks, current = [], ""
-    for line in lines:
-        if len(current) + len(line) < max_tokens:
-            current += line.strip() + " "
-        else:
-            if current.strip():
-                chunks.append(current.strip())
-            current = line.strip() + " "
-    if current.strip():
-        chunks.append(current.strip())
-    return chunks
+def iter_segments_from_file(file_path):
+    ext = os.path.splitext(file_path)[-1].lower()
+    if ext == ".pdf":
+        return iter_pdf_pages(file_path)
+    elif ext == ".docx":
+        return iter_docx_paragraphs(file_path)
+    elif ext == ".pptx":
+        return iter_pptx_slides(file_path)
+    elif ext in [".txt", ".md"]:
+        return iter_txt_blocks(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
 
 def get_text_from_file(file_path):
     ext = os.path.splitext(file_path)[-1].lower()
@@ -96,14 +158,15 @@ def run_ingestion_agent(file_path, receiver_agent="IndexAgent"):
     try:
         ext = os.path.splitext(file_path)[-1].lower()
         if ext == ".csv":
-            df = get_text_from_file(file_path)
-            chunks = chunk_csv_dataframe(df, rows_per_chunk=20)
+            chunks, chunk_meta = [], []
+            for item in iter_csv_chunks(file_path):
+                chunks.append(item.pop("chunk"))
+                chunk_meta.append(item)
         else:
-            raw_text = get_text_from_file(file_path)
-            if HAS_TIKTOKEN:
-                chunks = split_into_chunks_tiktoken(raw_text)
-            else:
-                chunks = split_into_chunks_line(raw_text)
+            chunks, chunk_meta = [], []
+            for item in chunk_stream(iter_segments_from_file(file_path)):
+                chunks.append(item.pop("chunk"))
+                chunk_meta.append(item)
 
         # Placeholder for embedding generation — replace with Gemini/Groq later
         embeddings = [None] * len(chunks)
@@ -115,7 +178,9 @@ def run_ingestion_agent(file_path, receiver_agent="IndexAgent"):
             payload={
                 "chunks": chunks,
                 "embeddings": embeddings,
-                "source_file": os.path.basename(file_path)
+                "chunk_meta": chunk_meta,
+                "source_file": os.path.basename(file_path),
+                "source_path": os.path.abspath(file_path)
             }
         )
 
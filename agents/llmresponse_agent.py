@@ -1,21 +1,22 @@
 import json
-from utils.llm_call import call_llm_gemini
+from utils.llm_call import call_llm, call_llm_stream, call_llm_async, timed_stream
+from utils.concurrency import run_cpu, llm_slot
+from utils.embedding import get_query_embedding, get_embeddings_cached
+from utils.chunking import count_tokens
+from utils.context_packing import pack_context
+from utils.config import CONTEXT_ORDER
+from utils.semantic_cache import SemanticCache, context_fingerprint
 from core_mcp.mcp import MCPMessage  # Make sure this is imported
 
+# Reuses answers to near-identical questions asked over the same context
+answer_cache = SemanticCache()
 
-# Function to handle MCP message using Large Language Models
 
-def handle_llm_message(mcp_message):
-    payload = mcp_message["payload"]  # FIXED: class property
-    context_chunks = payload["retrieved_context"]
-    query = payload["query"]
-    trace_id = mcp_message["trace_id"]
-
-    # Combine context
-    context_text = "\n\n".join(context_chunks)
+# Function to handle MCP message using Large Language Models
 
+def build_prompt(context_text, query):
     # Strong Prompt
-    prompt = f"""
+    return f"""
 You are a focused and concise assistant, you can answer like an analyst, student, teacher, data scientist, salesman and more
 
 Strictly follow these instructions:
@@ -38,27 +39,125 @@ Strictly follow these instructions:
 ### Your Answer:
 """
 
-    # Call Gemini
-    answer = call_llm_gemini(prompt)
 
-    # Return MCP message
-    response_msg = MCPMessage(
+def _prepare_llm_request(mcp_message):
+    """Build the prompt and look the question up in the answer cache."""
+    payload = mcp_message["payload"]  # FIXED: class property
+    context_chunks = payload["retrieved_context"]
+    query = payload["query"]
+
+    # Batch retrieval hands over the embedding it already computed
+    query_embedding = payload.get("query_embedding")
+    if query_embedding is None:
+        query_embedding = get_query_embedding(query)
+
+    # Combine context: dedupe, merge adjacent windows, order, fit the token budget
+    chunk_embeddings = None
+    if CONTEXT_ORDER == "mmr" and context_chunks:
+        chunk_embeddings = get_embeddings_cached(context_chunks)
+    packed_chunks, context_report = pack_context(
+        context_chunks,
+        payload.get("retrieved_metadata"),
+        query_embedding=query_embedding,
+        chunk_embeddings=chunk_embeddings,
+    )
+    context_text = "\n\n".join(packed_chunks)
+    prompt = build_prompt(context_text, query)
+    context_report["prompt_tokens"] = count_tokens(prompt)
+    print("🧩 Context packing:", context_report)
+
+    # Semantic cache lookup
+    fingerprint = context_fingerprint(context_chunks, payload.get("retrieved_ids"))
+    answer = answer_cache.lookup(query_embedding, fingerprint)
+    if answer is not None:
+        print("⚡ Answer cache hit:", answer_cache.stats())
+
+    return {
+        "query": query,
+        "context_chunks": packed_chunks,
+        "context_report": context_report,
+        "trace_id": mcp_message["trace_id"],
+        "prompt": prompt,
+        "query_embedding": query_embedding,
+        "fingerprint": fingerprint,
+        "cached_answer": answer,
+    }
+
+def _remember_answer(request, answer):
+    if not answer.startswith("[ERROR"):
+        answer_cache.store(request["query_embedding"], request["fingerprint"], answer)
+
+def _response_message(request, answer):
+    return MCPMessage(
         sender="LLMResponseAgent",
         receiver="CoordinatorAgent",
         msg_type="LLM_RESPONSE",
-        trace_id=trace_id,
+        trace_id=request["trace_id"],
         payload={
-            "answer": answer.strip(),
-            "context_used": context_chunks,
-            "query": query
+            "answer": (answer or "").strip(),
+            "context_used": request["context_chunks"],
+            "answer_cache_hit": request["cached_answer"] is not None,
+            "context_report": request["context_report"],
+            "query": request["query"]
         }
     )
 
+def handle_llm_message(mcp_message, stream=False):
+    """
+    stream=True returns immediately with payload["answer_stream"], a token
+    generator. Consuming it fills payload["answer"] and payload["timings"].
+    """
+    request = _prepare_llm_request(mcp_message)
+    answer = request["cached_answer"]
+
+    if stream:
+        response_msg = _response_message(request, answer)
+        timings = response_msg.payload["timings"] = {}
+
+        def answer_stream():
+            parts, status = [], {}
+            tokens = iter([answer]) if answer is not None else call_llm_stream(request["prompt"], status=status)
+            for token in timed_stream(tokens, timings):
+                parts.append(token)
+                yield token
+            full_answer = "".join(parts).strip()
+            response_msg.payload["answer"] = full_answer
+            # A stream that failed part-way ends with the error after partial text
+            if answer is None and "error" not in status:
+                _remember_answer(request, full_answer)
+            print(f"⏱️ LLM time to first token: {timings.get('ttft_s', 0):.3f}s | total: {timings['total_s']:.3f}s")
+
+        print("\n LLMResponseAgent → CoordinatorAgent MCP Message (streaming):")
+        print(json.dumps(response_msg.to_dict(), indent=2))
+        response_msg.payload["answer_stream"] = answer_stream()
+        return response_msg
+
+    # Gemini on a cache miss
+    if answer is None:
+        answer = call_llm(request["prompt"])
+        _remember_answer(request, answer)
+
+    # Return MCP message
+    response_msg = _response_message(request, answer)
+
     print("\n LLMResponseAgent → CoordinatorAgent MCP Message:")
     print(json.dumps(response_msg.to_dict(), indent=2))  # FIXED: use response_msg, not mcp_message
 
     return response_msg  # FIXED: must return for chaining
 
+async def handle_llm_message_async(mcp_message):
+    """
+    Async variant for concurrent pipelines: cache lookup runs in the CPU
+    executor, and the LLM call awaits under the global in-flight limit.
+    """
+    request = await run_cpu(_prepare_llm_request, mcp_message)
+    answer = request["cached_answer"]
+    if answer is None:
+        async with llm_slot():
+            answer = await call_llm_async(request["prompt"])
+        _remember_answer(request, answer)
+    return _response_message(request, answer)
+
 
 # Optional dev test block
 if __name__ == "__main__":
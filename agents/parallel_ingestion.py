@@ -0,0 +1,92 @@
+# agents/parallel_ingestion.py
+#
+# Parallel multi-file ingestion:
+#   parse + chunk   -> process pool (one file per task, all cores)
+#   embed           -> this process, in large cross-file batches
+#   write           -> a single writer thread committing to the vector store
+# The three stages overlap: workers keep parsing while a batch is embedded,
+# and the writer persists the previous batch in the meantime.
+
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from core_mcp.mcp import MCPMessage
+from agents.ingestion_agent import run_ingestion_agent
+from agents.indexagent import handle_index_message
+from utils.config import INGEST_WORKERS, EMBED_BATCH_CHUNKS
+from utils.embedding import get_embeddings_cached, get_embedding_cache
+
+_DONE = object()
+
+
+def _writer_loop(commit_queue, on_committed, errors):
+    while True:
+        item = commit_queue.get()
+        if item is _DONE:
+            return
+        file_path, msg = item
+        try:
+            handle_index_message(msg)
+            if on_committed:
+                on_committed(file_path, len(msg.payload["chunks"]))
+        except Exception as e:
+            errors.append((file_path, e))
+            print(f"❌ Indexing failed for '{file_path}': {e}")
+
+
+def _embed_and_enqueue(batch, commit_queue):
+    texts = [chunk for _, msg in batch for chunk in msg.payload["chunks"]]
+    vectors = get_embeddings_cached(texts)
+    print(f"🔢 Embedded {len(texts)} chunks from {len(batch)} files | cache: {get_embedding_cache().stats()}")
+    offset = 0
+    for file_path, msg in batch:
+        n = len(msg.payload["chunks"])
+        msg.payload["embeddings"] = vectors[offset:offset + n]
+        offset += n
+        commit_queue.put((file_path, msg))
+
+
+def ingest_files_parallel(file_paths, on_committed=None, workers=INGEST_WORKERS, embed_batch=EMBED_BATCH_CHUNKS):
+    """
+    Ingest and index file_paths concurrently.
+    on_committed(file_path, num_chunks) is called from the writer thread
+    after each file has been written to the index.
+    Returns a list of (file_path, error) for files that failed.
+    """
+    errors = []
+    commit_queue = queue.Queue(maxsize=4)  # back-pressure on the embed stage
+    writer = threading.Thread(target=_writer_loop, args=(commit_queue, on_committed, errors), daemon=True)
+    writer.start()
+
+    batch, batch_chunks = [], 0
+    try:
+        # "spawn" keeps the parent's torch/FAISS state out of the workers.
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=get_context("spawn")) as pool:
+            futures = {pool.submit(run_ingestion_agent, p): p for p in file_paths}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    msg = future.result()
+                except Exception as e:
+                    errors.append((file_path, e))
+                    print(f"❌ Ingestion failed for '{file_path}': {e}")
+                    continue
+                if msg.type == MCPMessage.TYPE_ERROR:
+                    errors.append((file_path, msg.payload["error"]))
+                    print(f"❌ Ingestion failed for '{file_path}': {msg.payload['error']}")
+                    continue
+
+                batch.append((file_path, msg))
+                batch_chunks += len(msg.payload["chunks"])
+                if batch_chunks >= embed_batch:
+                    _embed_and_enqueue(batch, commit_queue)
+                    batch, batch_chunks = [], 0
+
+        if batch:
+            _embed_and_enqueue(batch, commit_queue)
+    finally:
+        commit_queue.put(_DONE)
+        writer.join()
+    return errors
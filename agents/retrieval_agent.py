@@ -1,60 +1,148 @@
 import json
-import faiss
-import numpy as np
-from utils.embedding import get_embedding
+import uuid
+from utils.embedding import get_query_embedding, get_query_embeddings
+from utils.vector_store import get_vector_store
+from utils.cache import LRUCache, normalize_query
+from utils.config import RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL, RETRIEVAL_MODE, RETRIEVAL_K, RRF_K
+from utils.concurrency import run_cpu
 from core_mcp.mcp import MCPMessage
 
-def handle_retrieval_message(mcp_message):
-    payload = mcp_message.payload
-    query = payload["query"]
-
-    print("🔍 [RetrievalAgent] Received MCP message:")
-    print(json.dumps(mcp_message.to_dict(), indent=2))
-
-    # ✅ Load FAISS index
-    index = faiss.read_index("vector_index.faiss")
-    dim = index.d
-    print("FAISS index dimension:", dim)
+# (normalized query, k, mode, filters, index generation) -> hits. Any index write bumps the
+# generation, so stale entries can never be returned.
+retrieval_cache = LRUCache(RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL)
 
-    # ✅ Load metadata
-    with open("chunk_metadata.json", "r") as f:
-        metadata = json.load(f)
+def reciprocal_rank_fusion(rankings, k, rrf_k=RRF_K):
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking, 1):
+            scores[vector_id] = scores.get(vector_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
 
-    # ✅ Embed the query
-    query_embedding = get_embedding(query)
-    query_vector = np.array([query_embedding], dtype="float32")
-    print("Query embedding shape:", query_vector.shape)
+def search_hybrid(store, query, query_vector, k, filters=None):
+    """
+    Vector and BM25 candidates (2k each) fused with RRF. Returns
+    (fused score, record) pairs, best first.
+    """
+    return search_hybrid_batch(store, [query], query_vector, k, filters)[0]
 
-    # 🔍 Search
-    k = 15  # top-k results (increase for more context)
-    distances, indices = index.search(query_vector, k)
+def search_hybrid_batch(store, queries, query_vectors, k, filters=None):
+    """search_hybrid for many queries: one vector search over the (N, d) matrix."""
+    candidates = 2 * k
+    filters = store.resolve_filters(filters)  # once for the vector and every lexical search
+    vector_hits = store.search_ids(query_vectors, candidates, filters)
+    fused = []
+    for query, hits in zip(queries, vector_hits):
+        lexical_ids = [i for _, i in store.search_lexical(query, candidates, filters)]
+        fused.append(reciprocal_rank_fusion([[i for _, i in hits], lexical_ids], k))
+    # One chunk-store lookup for the whole batch
+    records = iter(store.get_records([i for ranking in fused for i, _ in ranking]))
+    return [
+        [(score, record) for (_, score), record in zip(ranking, records) if record is not None]
+        for ranking in fused
+    ]
 
-    # ✅ Collect retrieved chunks
-    retrieved_chunks = []
-    for idx in indices[0]:
-        if idx < len(metadata):
-            retrieved_chunks.append(metadata[idx]["chunk"])
+def _search(store, queries, query_vectors, k, filters):
+    if RETRIEVAL_MODE == "hybrid":
+        return search_hybrid_batch(store, queries, query_vectors, k, filters)
+    return store.search(query_vectors, k, filters)
 
-    print(f"\n📦 Top retrieved chunks ({len(retrieved_chunks)}):\n")
-    for chunk in retrieved_chunks:
-        print("🔹", chunk)
+def _cache_key(store, query, k, filters):
+    filters_key = json.dumps(filters, sort_keys=True) if filters else None
+    return (normalize_query(query), k, RETRIEVAL_MODE, filters_key, store.generation)
 
-    # ✅ Return MCP message to LLMResponseAgent
-    response = {
+def _retrieval_result(trace_id, query, hits):
+    return {
         "type": "RETRIEVAL_RESULT",
         "sender": "RetrievalAgent",
         "receiver": "LLMResponseAgent",
-        "trace_id": mcp_message.trace_id,
+        "trace_id": trace_id,
         "payload": {
-            "retrieved_context": retrieved_chunks,
+            "retrieved_context": [record["chunk"] for _, record in hits],
+            "retrieved_ids": [record["id"] for _, record in hits],
+            "retrieved_metadata": [
+                {key: value for key, value in record.items() if key != "chunk"}
+                for _, record in hits
+            ],
             "query": query
         }
     }
 
+def handle_retrieval_message(mcp_message):
+    payload = mcp_message.payload
+    query = payload["query"]
+    # Optional {"source_file", "doc_type", "page_range"}; applied inside the index search
+    filters = payload.get("filters") or None
+
+    print("🔍 [RetrievalAgent] Received MCP message:")
+    print(json.dumps(mcp_message.to_dict(), indent=2))
+
+    # ✅ Use the resident vector store (reloads only if the files changed)
+    store = get_vector_store()
+    store.refresh()
+    print("FAISS index dimension:", store.dim)
+
+    k = RETRIEVAL_K  # hybrid search finds exact terms without a large k
+    cache_key = _cache_key(store, query, k, filters)
+    hits = retrieval_cache.get(cache_key)
+    if hits is None:
+        # ✅ Embed the query (memoized per query text)
+        query_vector = get_query_embedding(query)
+        print("Query embedding shape:", query_vector.shape)
+
+        # 🔍 Search
+        hits = _search(store, [query], query_vector, k, filters)[0]
+        retrieval_cache.put(cache_key, hits)
+    else:
+        print("⚡ Retrieval cache hit:", retrieval_cache.stats())
+
+    # ✅ Return MCP message to LLMResponseAgent
+    response = _retrieval_result(mcp_message.trace_id, query, hits)
+
+    print(f"\n📦 Top retrieved chunks ({len(hits)}):\n")
+    for chunk in response["payload"]["retrieved_context"]:
+        print("🔹", chunk)
+
     print("\n✅ RetrievalAgent → LLMResponseAgent MCP Message:")
     print(json.dumps(response, indent=2))
     return response
 
+def handle_retrieval_batch(queries, filters=None):
+    """
+    Retrieve for many queries at once (evaluation sets, bulk answering):
+    one store refresh, one batched encode of the queries not embedded yet
+    and one index search over the (N, d) query matrix. Returns one
+    RETRIEVAL_RESULT message per query, in order, without per-query logging.
+    Each payload also carries its "query_embedding" for the LLM agent.
+    """
+    queries = list(queries)
+    store = get_vector_store()
+    store.refresh()
+    k = RETRIEVAL_K
+    query_vectors = get_query_embeddings(queries)
+
+    keys = [_cache_key(store, query, k, filters) for query in queries]
+    hits = [retrieval_cache.get(key) for key in keys]
+    missing = [i for i, h in enumerate(hits) if h is None]
+    if missing:
+        found = _search(store, [queries[i] for i in missing], query_vectors[missing], k, filters)
+        for i, h in zip(missing, found):
+            hits[i] = h
+            retrieval_cache.put(keys[i], h)
+    print(f"🔍 [RetrievalAgent] Batch of {len(queries)} queries: {len(missing)} searched, "
+          f"{len(queries) - len(missing)} from cache")
+
+    responses = []
+    for query, vector, h in zip(queries, query_vectors, hits):
+        response = _retrieval_result(str(uuid.uuid4()), query, h)
+        response["payload"]["query_embedding"] = vector[None, :]
+        responses.append(response)
+    return responses
+
+async def handle_retrieval_message_async(mcp_message):
+    # Query embedding and FAISS search are CPU-bound; keep them off the event loop.
+    return await run_cpu(handle_retrieval_message, mcp_message)
+
 # -------------------------------
 # 🚀 Simulate retrieval from a query
 # -------------------------------
@@ -1,12 +1,40 @@
 import streamlit as st
 import os
-import tempfile
-from main import run_pipeline
+import time
+from main import run_pipeline, BackgroundIndexer
+from utils.config import UPLOAD_DIR
+from utils.embedding import get_model
+from utils.vector_store import get_vector_store
+from utils.warmup import warm_up
 from dotenv import load_dotenv
 
 load_dotenv()
 import json
 
+# Start loading the embedding model, index and LLM client in the background
+# once per server process, while the user is still uploading files.
+@st.cache_resource
+def start_warm_up():
+    return warm_up(background=True)
+
+start_warm_up()
+
+# Long-lived resources shared by every session and kept across reruns
+@st.cache_resource
+def get_indexer():
+    return BackgroundIndexer()
+
+@st.cache_resource
+def load_vector_store():
+    return get_vector_store()
+
+@st.cache_resource(show_spinner="Loading embedding model...")
+def load_embedding_model():
+    return get_model()
+
+indexer = get_indexer()
+load_vector_store()
+
 # ---------------- SESSION STATE ----------------
 if "history" not in st.session_state:
     st.session_state.history = []
@@ -14,6 +42,8 @@ if "saved_paths" not in st.session_state:
     st.session_state.saved_paths = []
 if "last_user_query" not in st.session_state:
     st.session_state.last_user_query = ""
+if "written_uploads" not in st.session_state:
+    st.session_state.written_uploads = {}  # path -> (name, size, file_id) last written
 
 
 # ---------------- STYLING ----------------
@@ -129,11 +159,55 @@ uploaded_files = st.file_uploader(
 if uploaded_files:
     st.session_state.saved_paths = []
     for file in uploaded_files:
-        temp_path = os.path.join(tempfile.gettempdir(), file.name)
-        with open(temp_path, "wb") as f:
-            f.write(file.getbuffer())
+        # One shared directory: the same file keeps its path across sessions,
+        # so the manifest skips it and a changed copy replaces the old chunks.
+        temp_path = os.path.abspath(os.path.join(UPLOAD_DIR, os.path.basename(file.name)))
+        upload_key = (file.name, file.size, getattr(file, "file_id", None))
+        # Reruns keep the same uploads: only write and index what is new.
+        if st.session_state.written_uploads.get(temp_path) != upload_key:
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+            tmp_path = f"{temp_path}.{os.getpid()}.{id(file)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(file.getbuffer())
+            os.replace(tmp_path, temp_path)
+            st.session_state.written_uploads[temp_path] = upload_key
+            indexer.submit(temp_path)
         st.session_state.saved_paths.append(temp_path)
-    st.success("Files uploaded successfully.")
+    st.success("Files uploaded successfully. Indexing runs in the background.")
+
+# ---------------- INDEXING STATUS ----------------
+STATUS_ICONS = {"queued": "🕒", "indexing": "⏳", "indexed": "✅", "skipped": "✅", "failed": "❌"}
+
+def render_index_status():
+    statuses = indexer.status()
+    paths = [p for p in st.session_state.saved_paths if p in statuses]
+    if not paths:
+        return
+    done = sum(statuses[p]["state"] in ("indexed", "skipped", "failed") for p in paths)
+    st.markdown("**Indexing**")
+    st.progress(done / len(paths), text=f"{done}/{len(paths)} files ready")
+    for path in paths:
+        entry = statuses[path]
+        line = f"{STATUS_ICONS[entry['state']]} {os.path.basename(path)} · {entry['state']}"
+        if entry["num_chunks"] is not None:
+            line += f" · {entry['num_chunks']} chunks"
+        if entry["seconds"] is not None:
+            line += f" · {entry['seconds']:.1f}s"
+        st.caption(line)
+        if entry["error"]:
+            st.caption(f"   {entry['error']}")
+
+# Refresh the sidebar on a timer while files are still being indexed.
+if hasattr(st, "fragment") and indexer.pending():
+    render_index_status = st.fragment(run_every=1.0)(render_index_status)
+with st.sidebar:
+    render_index_status()
+    search_in = st.multiselect(
+        "Search only in",
+        [os.path.abspath(p) for p in st.session_state.saved_paths],
+        format_func=os.path.basename,
+        help="Leave empty to search all indexed documents.",
+    )
 
 # ---------------- CHAT PAGE ----------------
 if page == "Chat":
@@ -173,12 +247,35 @@ if page == "Chat":
     if user_input:
         if st.session_state.saved_paths:
             st.session_state.history.append(("user", user_input, []))
+            st.markdown(f'<div class="user">{user_input}</div>', unsafe_allow_html=True)
+            asked_at = time.perf_counter()
+            statuses = indexer.status()
+            still_indexing = [p for p in st.session_state.saved_paths
+                              if statuses.get(p, {}).get("state") in ("queued", "indexing")]
+            if still_indexing:
+                st.caption(f"⏳ {len(still_indexing)} file(s) still indexing, answering from the documents indexed so far.")
             with st.spinner("Thinking..."):
-                final_answer, contexts = run_pipeline(
-                    st.session_state.saved_paths,
-                    user_input
+                load_embedding_model()
+                # Files are indexed by the background worker; only query here.
+                answer_stream, contexts = run_pipeline(
+                    [],
+                    user_input,
+                    stream=True,
+                    filters={"source_path": search_in} if search_in else None
                 )
+            # Render tokens as they arrive
+            placeholder = st.empty()
+            final_answer, first_token_at = "", None
+            for token in answer_stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter() - asked_at
+                final_answer += token
+                placeholder.markdown(f'<div class="bot">{final_answer}▌</div>', unsafe_allow_html=True)
+            placeholder.markdown(f'<div class="bot">{final_answer}</div>', unsafe_allow_html=True)
+            print(f"⏱️ Question → first token: {first_token_at or 0:.3f}s | → full answer: {time.perf_counter() - asked_at:.3f}s")
+            final_answer = final_answer.strip()
             st.session_state.history.append(("bot", final_answer, contexts))
+            st.session_state.last_user_query = user_input
             if hasattr(st, "experimental_rerun"):
                 st.experimental_rerun()
             else:
@@ -0,0 +1,130 @@
+# benchmarks/ann_benchmark.py
+#
+# Compare the ANN index types from utils/index_factory.py against the exact
+# IndexFlatL2 on recall@k and per-query latency.
+#
+#   python -m benchmarks.ann_benchmark                     # vectors from vector_index.faiss
+#   python -m benchmarks.ann_benchmark --synthetic 200000  # random clustered vectors
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.config import INDEX_PATH
+from utils.index_factory import build_from_vectors, vectors_and_ids
+from utils.vector_store import shard_index_files
+
+CONFIGS = [
+    ("flat", {}),
+    ("hnsw", {"hnsw_m": 32, "ef_search": 32}),
+    ("hnsw", {"hnsw_m": 32, "ef_search": 64}),
+    ("hnsw", {"hnsw_m": 32, "ef_search": 128}),
+    ("ivf_flat", {"nprobe": 8}),
+    ("ivf_flat", {"nprobe": 32}),
+    ("ivf_pq", {"nprobe": 16}),
+    ("ivf_pq", {"nprobe": 64}),
+]
+
+
+def synthetic_vectors(n, dim, n_clusters=256, seed=0):
+    # Clustered data behaves much more like sentence embeddings than uniform noise.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype("float32")
+
+
+def load_vectors(index_path):
+    """Stored vectors of every shard of the index at index_path."""
+    parts = []
+    for path in shard_index_files(index_path).values():
+        vectors, _ = vectors_and_ids(faiss.read_index(path))
+        if len(vectors):
+            parts.append(vectors)
+    if not parts:
+        raise SystemExit(f"No vectors in '{index_path}'; index some documents or use --synthetic")
+    return np.concatenate(parts)
+
+
+def make_queries(vectors, n_queries, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    noise = 0.05 * vectors.std() * rng.normal(size=(len(rows), vectors.shape[1]))
+    return (vectors[rows] + noise).astype("float32")
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def time_queries(index, queries, k):
+    latencies = []
+    results = np.empty((len(queries), k), dtype="int64")
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results[i] = ids[0]
+    return results, np.array(latencies)
+
+
+def run(vectors, queries, k, configs=CONFIGS):
+    truth = faiss.IndexFlatL2(vectors.shape[1])
+    truth.add(vectors)
+    _, truth_ids = truth.search(queries, k)
+
+    rows = []
+    for index_type, params in configs:
+        if index_type == "ivf_pq" and vectors.shape[1] % params.get("pq_m", 48):
+            params = {**params, "pq_m": next(m for m in (48, 32, 16, 8, 4, 2, 1) if vectors.shape[1] % m == 0)}
+        start = time.perf_counter()
+        index = build_from_vectors(index_type, vectors, **params)
+        build_s = time.perf_counter() - start
+        found, lat = time_queries(index, queries, k)
+        rows.append({
+            "index_type": index_type,
+            "params": params,
+            "build_s": round(build_s, 3),
+            f"recall@{k}": round(recall_at_k(found, truth_ids), 4),
+            "mean_ms": round(float(lat.mean()), 3),
+            "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index recall/latency comparison")
+    parser.add_argument("--index", default=INDEX_PATH, help="FAISS index to take vectors from")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=15)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.synthetic, args.dim) if args.synthetic else load_vectors(args.index)
+    queries = make_queries(vectors, args.queries)
+    print(f"📊 {len(vectors)} vectors | dim {vectors.shape[1]} | {len(queries)} queries | k={args.k}")
+
+    rows = run(vectors, queries, args.k)
+    recall_key = f"recall@{args.k}"
+    print(f"{'index':<10} {'params':<34} {'build s':>8} {recall_key:>10} {'mean ms':>8} {'p95 ms':>8}")
+    for r in rows:
+        print(f"{r['index_type']:<10} {json.dumps(r['params']):<34} {r['build_s']:>8} "
+              f"{r[recall_key]:>10} {r['mean_ms']:>8} {r['p95_ms']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": len(vectors), "dim": vectors.shape[1], "k": args.k, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
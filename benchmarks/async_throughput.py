@@ -0,0 +1,95 @@
+# benchmarks/async_throughput.py
+#
+# Throughput of the synchronous run_pipeline against the asyncio pipeline
+# under N concurrent queries, using the offline stub LLM so the numbers do
+# not depend on Gemini. Runs against a throwaway index in a temp directory.
+#
+#   python -m benchmarks.async_throughput --queries 64 --token-delay 0.02
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+WORK_DIR = tempfile.mkdtemp(prefix="rag_async_bench_")
+os.environ.setdefault("RAG_LLM_BACKEND", "stub")
+os.environ.setdefault("RAG_INDEX_PATH", os.path.join(WORK_DIR, "vector_index.faiss"))
+os.environ.setdefault("RAG_CHUNK_STORE_PATH", os.path.join(WORK_DIR, "chunk_store.sqlite"))
+os.environ.setdefault("RAG_METADATA_PATH", os.path.join(WORK_DIR, "chunk_metadata.json"))
+os.environ.setdefault("RAG_MANIFEST_PATH", os.path.join(WORK_DIR, "index_manifest.json"))
+os.environ.setdefault("RAG_EMBEDDING_CACHE_PATH", os.path.join(WORK_DIR, "embedding_cache.sqlite"))
+os.environ.setdefault("RAG_BM25_PATH", os.path.join(WORK_DIR, "bm25_index.npz"))
+os.environ.setdefault("RAG_FULL_VECTORS_PATH", os.path.join(WORK_DIR, "vectors_f32.bin"))
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+
+from benchmarks.synthetic_corpus import make_corpus
+
+
+def summarize(label, latencies, wall):
+    lat = np.array(latencies)
+    print(f"{label:<6} {len(lat):>7} {wall:>8.2f} {len(lat) / wall:>8.2f} "
+          f"{np.percentile(lat, 50):>8.3f} {np.percentile(lat, 95):>8.3f}")
+    return {"queries": len(lat), "wall_s": wall, "qps": len(lat) / wall,
+            "p50_s": float(np.percentile(lat, 50)), "p95_s": float(np.percentile(lat, 95))}
+
+
+def run_sync(queries):
+    from main import run_pipeline
+    latencies = []
+    start = time.perf_counter()
+    for q in queries:
+        t0 = time.perf_counter()
+        run_pipeline([], q)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+async def run_async(queries):
+    from main import run_pipeline_async
+
+    async def one(q):
+        t0 = time.perf_counter()
+        await run_pipeline_async([], q)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(q) for q in queries))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async pipeline throughput")
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--docs", type=int, default=1, help="synthetic documents per type")
+    parser.add_argument("--token-delay", type=float, default=None, help="stub LLM seconds per token")
+    args = parser.parse_args()
+    if args.token_delay is not None:
+        # Read by utils.config, which the pipeline imports below.
+        os.environ["RAG_STUB_TOKEN_DELAY"] = str(args.token_delay)
+
+    from main import index_files
+    corpus = make_corpus(os.path.join(WORK_DIR, "corpus"), docs_per_type=args.docs, pages=5)
+    quiet = contextlib.redirect_stdout(io.StringIO())  # the agents log every message
+    with quiet:
+        index_files([d["path"] for d in corpus])
+
+    facts = [f for d in corpus for f in d["facts"]]
+    # Unique wording per query so neither the retrieval nor the answer cache hides the work.
+    queries = [f"{facts[i % len(facts)]['question']} (run {i})" for i in range(args.queries)]
+
+    with quiet:
+        sync_result = run_sync(queries)
+        async_result = asyncio.run(run_async([q + " async" for q in queries]))
+    print(f"{'mode':<6} {'queries':>7} {'wall s':>8} {'qps':>8} {'p50 s':>8} {'p95 s':>8}")
+    summarize("sync", *sync_result)
+    summarize("async", *async_result)
+
+
+if __name__ == "__main__":
+    main()
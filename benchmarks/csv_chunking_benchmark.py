@@ -0,0 +1,98 @@
+# benchmarks/csv_chunking_benchmark.py
+#
+# Old DataFrame path (pd.read_csv + DataFrame.to_string per slice) against the
+# streaming csv.reader path, on rows/s and peak RSS. Each path runs in its own
+# child process, and the peak is reset after the imports, so it covers only
+# the chunking itself.
+#
+#   python -m benchmarks.csv_chunking_benchmark --rows 1000000
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def make_csv(path, rows, cols=12, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(f"col_{c}" for c in range(cols)) + "\n")
+        for i in range(rows):
+            values = [str(i)] + [
+                "".join(rng.choices(string.ascii_lowercase, k=8)) if c % 3 else f"{rng.random() * 1000:.3f}"
+                for c in range(1, cols)
+            ]
+            f.write(",".join(values) + "\n")
+
+
+def _run_path(method, path, result_queue):
+    from agents.ingestion_agent import read_csv, chunk_csv_dataframe, iter_csv_chunks
+    from benchmarks.e2e_benchmark import peak_rss_mb, reset_peak_rss
+
+    reset_peak_rss()
+    start = time.perf_counter()
+    if method == "dataframe":
+        chunks = chunk_csv_dataframe(read_csv(path))
+        n_chunks = len(chunks)
+    else:
+        n_chunks = sum(1 for _ in iter_csv_chunks(path))
+    result_queue.put({
+        "method": method,
+        "seconds": time.perf_counter() - start,
+        "chunks": n_chunks,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    })
+
+
+def run(path, rows, methods=("dataframe", "stream")):
+    ctx = get_context("spawn")
+    results = []
+    for method in methods:
+        q = ctx.Queue()
+        proc = ctx.Process(target=_run_path, args=(method, path, q))
+        proc.start()
+        result = q.get()
+        proc.join()
+        result["rows_per_s"] = round(rows / result["seconds"])
+        result["seconds"] = round(result["seconds"], 3)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV chunking throughput and memory")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--csv", help="benchmark an existing CSV instead of a synthetic one")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    if args.csv:
+        path = args.csv
+        with open(path, "rb") as f:
+            rows = sum(1 for _ in f) - 1
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"bench_{args.rows}.csv")
+        if not os.path.exists(path):
+            make_csv(path, args.rows)
+        rows = args.rows
+
+    print(f"📊 {rows} rows | {os.path.getsize(path) / 1e6:.1f} MB")
+    results = run(path, rows)
+    print(f"{'method':<10} {'seconds':>8} {'rows/s':>10} {'chunks':>8} {'peak RSS MB':>12}")
+    for r in results:
+        print(f"{r['method']:<10} {r['seconds']:>8} {r['rows_per_s']:>10} {r['chunks']:>8} {r['peak_rss_mb']:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
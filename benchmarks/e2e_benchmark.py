@@ -0,0 +1,346 @@
+# benchmarks/e2e_benchmark.py
+#
+# End-to-end performance of the whole system on a synthetic corpus with the
+# offline stub LLM. Each stage runs in its own child process against a
+# throwaway work directory, so peak RSS is attributed to one agent at a time
+# (the parent never imports the parsers or the model):
+#   corpus     synthetic documents written to disk     seconds, bytes
+#   ingestion  IngestionAgent on every document        docs/s, chunks/s
+#   index      IndexAgent on the ingested chunks       build time, chunks/s
+#   retrieval  RetrievalAgent, one query at a time     p50/p95/p99, plus batch qps
+#   llm        LLMResponseAgent on retrieved context   p50/p95/p99
+#   pipeline   run_pipeline([], question)              p50/p95/p99 answer latency
+# Results go to a JSON file; --compare prints the change against an earlier one.
+#
+#   python -m benchmarks.e2e_benchmark --docs 2 --pages 20 --queries 100
+#   python -m benchmarks.e2e_benchmark --compare e2e_before.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+
+STAGES = ("corpus", "ingestion", "index", "retrieval", "llm", "pipeline")
+
+
+def bench_env(work_dir, token_delay=None):
+    env = {
+        "RAG_LLM_BACKEND": "stub",
+        "RAG_INDEX_PATH": os.path.join(work_dir, "vector_index.faiss"),
+        "RAG_CHUNK_STORE_PATH": os.path.join(work_dir, "chunk_store.sqlite"),
+        "RAG_METADATA_PATH": os.path.join(work_dir, "chunk_metadata.json"),
+        "RAG_MANIFEST_PATH": os.path.join(work_dir, "index_manifest.json"),
+        "RAG_EMBEDDING_CACHE_PATH": os.path.join(work_dir, "embedding_cache.sqlite"),
+        "RAG_BM25_PATH": os.path.join(work_dir, "bm25_index.npz"),
+        "RAG_FULL_VECTORS_PATH": os.path.join(work_dir, "vectors_f32.bin"),
+        # Near-identical benchmark questions must not be served from the answer cache.
+        "RAG_ANSWER_CACHE_THRESHOLD": "1.01",
+    }
+    if token_delay is not None:
+        env["RAG_STUB_TOKEN_DELAY"] = str(token_delay)
+    return env
+
+
+def reset_peak_rss():
+    # ru_maxrss survives fork/exec, so a child would report at least its
+    # parent's peak. On Linux, writing 5 to clear_refs resets VmHWM instead.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def latency_stats(latencies):
+    lat = np.asarray(latencies) * 1000
+    return {
+        "count": len(lat),
+        "mean_ms": round(float(lat.mean()), 3),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+    }
+
+
+def _questions(work_dir, n, tag):
+    with open(os.path.join(work_dir, "corpus.json")) as f:
+        facts = [fact for doc in json.load(f) for fact in doc["facts"]]
+    # Unique wording per question so the retrieval and embedding caches cannot hide the work.
+    return [(f"{facts[i % len(facts)]['question']} ({tag} {i})", facts[i % len(facts)]["answer"])
+            for i in range(n)]
+
+
+# ---------- stages (each runs in its own process) ----------
+
+def stage_corpus(work_dir, args):
+    from benchmarks.synthetic_corpus import make_corpus
+
+    start = time.perf_counter()
+    corpus = make_corpus(os.path.join(work_dir, "corpus"), docs_per_type=args.docs, pages=args.pages,
+                         csv_rows=args.csv_rows)
+    seconds = time.perf_counter() - start
+    with open(os.path.join(work_dir, "corpus.json"), "w") as f:
+        json.dump(corpus, f)
+    return {
+        "docs": len(corpus),
+        "bytes": sum(os.path.getsize(doc["path"]) for doc in corpus),
+        "seconds": round(seconds, 3),
+    }
+
+
+def stage_ingestion(work_dir, args):
+    from agents.ingestion_agent import run_ingestion_agent
+    from core_mcp.mcp import MCPMessage
+
+    with open(os.path.join(work_dir, "corpus.json")) as f:
+        paths = [doc["path"] for doc in json.load(f)]
+    messages, failed = [], 0
+    start = time.perf_counter()
+    for path in paths:
+        msg = run_ingestion_agent(path)
+        if msg.type == MCPMessage.TYPE_ERROR:
+            failed += 1
+            continue
+        messages.append(msg.payload)
+    seconds = time.perf_counter() - start
+
+    with open(os.path.join(work_dir, "ingested.json"), "w") as f:
+        json.dump(messages, f)
+    chunks = sum(len(m["chunks"]) for m in messages)
+    size = sum(os.path.getsize(p) for p in paths)
+    return {
+        "docs": len(paths),
+        "failed": failed,
+        "chunks": chunks,
+        "bytes": size,
+        "seconds": round(seconds, 3),
+        "docs_per_s": round(len(paths) / seconds, 2),
+        "chunks_per_s": round(chunks / seconds, 1),
+        "mb_per_s": round(size / 1e6 / seconds, 2),
+    }
+
+
+def stage_index(work_dir, args):
+    from agents.indexagent import handle_index_message
+    from core_mcp.mcp import MCPMessage
+    from utils.embedding import get_model
+    from utils.vector_store import get_vector_store
+
+    with open(os.path.join(work_dir, "ingested.json")) as f:
+        payloads = json.load(f)
+    start = time.perf_counter()
+    get_model()
+    model_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in payloads:
+        handle_index_message(MCPMessage(
+            sender="Benchmark", receiver="IndexAgent", msg_type=MCPMessage.TYPE_INDEX, payload=payload
+        ))
+    seconds = time.perf_counter() - start
+
+    store = get_vector_store()
+    chunks = sum(len(p["chunks"]) for p in payloads)
+    index_bytes = sum(
+        os.path.getsize(os.path.join(work_dir, name)) for name in os.listdir(work_dir)
+        if name.startswith("vector_index") and name.endswith(".faiss")
+    )
+    return {
+        "chunks": chunks,
+        "vectors": store.ntotal,
+        "shards": len(store.shards),
+        "model_load_s": round(model_s, 3),
+        "build_s": round(seconds, 3),
+        "chunks_per_s": round(chunks / seconds, 1),
+        "index_bytes": index_bytes,
+    }
+
+
+def stage_retrieval(work_dir, args):
+    from agents.retrieval_agent import handle_retrieval_message, handle_retrieval_batch
+    from core_mcp.mcp import MCPMessage
+    from utils.embedding import get_model
+    from utils.vector_store import get_vector_store
+
+    # Load cost is reported by the index and pipeline stages; measure steady-state queries.
+    get_model()
+    get_vector_store().refresh()
+
+    questions = _questions(work_dir, args.queries, "retrieval")
+    latencies, results, hits = [], [], 0
+    for question, answer in questions:
+        msg = MCPMessage(sender="Benchmark", receiver="RetrievalAgent",
+                         msg_type=MCPMessage.TYPE_RETRIEVE, payload={"query": question})
+        start = time.perf_counter()
+        result = handle_retrieval_message(msg)
+        latencies.append(time.perf_counter() - start)
+        hits += any(answer in chunk for chunk in result["payload"]["retrieved_context"])
+        results.append(result)
+    with open(os.path.join(work_dir, "retrieved.json"), "w") as f:
+        json.dump(results, f)
+
+    batch = [q for q, _ in _questions(work_dir, args.queries, "batch")]
+    start = time.perf_counter()
+    handle_retrieval_batch(batch)
+    batch_s = time.perf_counter() - start
+    return {
+        **latency_stats(latencies),
+        "fact_hit_rate": round(hits / len(questions), 4),
+        "batch_s": round(batch_s, 3),
+        "batch_qps": round(len(batch) / batch_s, 1),
+    }
+
+
+def stage_llm(work_dir, args):
+    from agents.llmresponse_agent import handle_llm_message
+    from utils.embedding import get_model
+
+    get_model()
+    with open(os.path.join(work_dir, "retrieved.json")) as f:
+        retrieved = json.load(f)
+    latencies = []
+    for msg in retrieved:
+        start = time.perf_counter()
+        handle_llm_message(msg)
+        latencies.append(time.perf_counter() - start)
+    return latency_stats(latencies)
+
+
+def stage_pipeline(work_dir, args):
+    from main import run_pipeline
+
+    questions = _questions(work_dir, args.queries + 1, "pipeline")
+    # The first question pays for loading the model and index, as a fresh CLI run does.
+    start = time.perf_counter()
+    run_pipeline([], questions[0][0])
+    first_s = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for question, answer in questions[1:]:
+        start = time.perf_counter()
+        _, context = run_pipeline([], question)
+        latencies.append(time.perf_counter() - start)
+        hits += any(answer in chunk for chunk in context)
+    return {
+        **latency_stats(latencies),
+        "first_answer_s": round(first_s, 3),
+        "fact_hit_rate": round(hits / len(latencies), 4),
+    }
+
+
+def _run_stage(stage, work_dir, args, result_queue):
+    reset_peak_rss()
+    with contextlib.redirect_stdout(io.StringIO()):  # the agents log every message
+        result = globals()[f"stage_{stage}"](work_dir, args)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    result_queue.put(result)
+
+
+def run_stage(stage, work_dir, args):
+    ctx = get_context("spawn")
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, work_dir, args, result_queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"stage '{stage}' failed with exit code {proc.exitcode}")
+    return result_queue.get()
+
+
+# ---------- reporting ----------
+
+def environment():
+    from utils import config
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "retrieval_mode": config.RETRIEVAL_MODE,
+        "retrieval_k": config.RETRIEVAL_K,
+        "ann_index_type": config.ANN_INDEX_TYPE,
+        "vector_storage": config.VECTOR_STORAGE,
+        "context_order": config.CONTEXT_ORDER,
+    }
+
+
+def compare(current, baseline):
+    """Print every numeric metric of current next to its value in baseline."""
+    print(f"\n{'metric':<34} {'baseline':>12} {'current':>12} {'change':>9}")
+    for stage in STAGES:
+        now, before = current["stages"].get(stage, {}), baseline.get("stages", {}).get(stage, {})
+        for metric, value in now.items():
+            old = before.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old:+.1%}" if old else "n/a"
+            print(f"{stage + '.' + metric:<34} {old:>12} {value:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end ingestion, indexing, retrieval and answer benchmark")
+    parser.add_argument("--docs", type=int, default=2, help="synthetic documents per type")
+    parser.add_argument("--pages", type=int, default=10, help="pages (slides, sections) per document")
+    parser.add_argument("--csv-rows", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=None, help="stub LLM seconds per token")
+    parser.add_argument("--json", help="output file (default: e2e_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="rag_e2e_bench_")
+    os.environ.update(bench_env(work_dir, args.token_delay))  # inherited by every stage process
+    print(f"📁 Working in {work_dir}")
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        "environment": environment(),
+        "stages": {},
+    }
+    for stage in STAGES:  # each stage reads what the previous one left in work_dir
+        results["stages"][stage] = run_stage(stage, work_dir, args)
+        print(f"⏱️ {stage:<10} {json.dumps(results['stages'][stage])}")
+
+    out = args.json or f"e2e_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/quantization_report.py
+#
+# What fp16 / int8 vector storage saves in memory and costs in recall@k,
+# against the float32 index and exact search over it, with and without the
+# full-precision re-score of the top RESCORE_FACTOR * k candidates.
+#
+#   python -m benchmarks.quantization_report                      # vectors from vector_index.faiss
+#   python -m benchmarks.quantization_report --synthetic 200000 --index-type hnsw
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import faiss
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.ann_benchmark import synthetic_vectors, load_vectors, make_queries, recall_at_k
+from utils.config import INDEX_PATH, RESCORE_FACTOR
+from utils.full_vectors import rescore
+from utils.index_factory import INDEX_TYPES, STORAGE_TYPES, build_from_vectors
+
+
+def index_bytes(index):
+    # Serialized size tracks resident size closely for these index types.
+    return len(faiss.serialize_index(index))
+
+
+def run(vectors, queries, k, index_type="flat", rescore_factor=RESCORE_FACTOR):
+    truth = faiss.IndexFlatL2(vectors.shape[1])
+    truth.add(vectors)
+    _, truth_ids = truth.search(queries, k)
+
+    rows, baseline = [], None
+    for storage in STORAGE_TYPES:
+        start = time.perf_counter()
+        index = build_from_vectors(index_type, vectors, storage=storage)
+        build_s = time.perf_counter() - start
+        size = index_bytes(index)
+        baseline = baseline or size
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        search_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        start = time.perf_counter()
+        _, candidates = index.search(queries, k * rescore_factor)
+        _, rescored = rescore(queries, candidates, lambda ids: vectors[ids], k)
+        rescore_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        rows.append({
+            "storage": storage,
+            "bytes": size,
+            "bytes_per_vector": round(size / len(vectors), 1),
+            "saved": round(1 - size / baseline, 4),
+            "build_s": round(build_s, 3),
+            f"recall@{k}": round(recall_at_k(found, truth_ids), 4),
+            f"recall@{k}_rescored": round(recall_at_k(rescored, truth_ids), 4),
+            "search_ms": round(search_ms, 3),
+            "rescore_search_ms": round(rescore_ms, 3),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory saved vs recall lost by scalar quantization")
+    parser.add_argument("--index", default=INDEX_PATH, help="FAISS index to take vectors from")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--index-type", default="flat", choices=[t for t in INDEX_TYPES if t != "ivf_pq"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=RESCORE_FACTOR)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.synthetic, args.dim) if args.synthetic else load_vectors(args.index)
+    queries = make_queries(vectors, args.queries)
+    print(f"📊 {len(vectors)} vectors | dim {vectors.shape[1]} | {args.index_type} | "
+          f"{len(queries)} queries | k={args.k} | re-score {args.rescore_factor}x")
+
+    rows = run(vectors, queries, args.k, args.index_type, args.rescore_factor)
+    recall, rescored = f"recall@{args.k}", f"recall@{args.k}_rescored"
+    print(f"{'storage':<8} {'MB':>9} {'B/vec':>8} {'saved':>7} {recall:>10} {'+rescore':>9} {'ms/q':>7} {'ms/q rs':>8}")
+    for r in rows:
+        print(f"{r['storage']:<8} {r['bytes'] / 2**20:>9.1f} {r['bytes_per_vector']:>8} {r['saved']:>7.1%} "
+              f"{r[recall]:>10} {r[rescored]:>9} {r['search_ms']:>7} {r['rescore_search_ms']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": len(vectors), "dim": vectors.shape[1], "index_type": args.index_type,
+                       "k": args.k, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
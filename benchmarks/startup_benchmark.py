@@ -0,0 +1,120 @@
+# benchmarks/startup_benchmark.py
+#
+# Import-to-first-answer time of a fresh interpreter, the cost every CLI
+# invocation pays. Each measurement runs in its own subprocess against a
+# throwaway index built once up front, with the offline stub LLM.
+#
+#   cold        import main, ask immediately (everything loads on demand)
+#   background  import main, start warm_up() in a thread, let the "user"
+#               think for --think-time seconds, then ask
+#   eager       import main, warm_up() in the foreground, then ask
+#
+#   python -m benchmarks.startup_benchmark --repeat 3 --think-time 2
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+START = time.perf_counter()
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MODES = ("cold", "background", "eager")
+
+
+def bench_env(work_dir):
+    env = dict(os.environ)
+    env.setdefault("RAG_LLM_BACKEND", "stub")
+    env["RAG_INDEX_PATH"] = os.path.join(work_dir, "vector_index.faiss")
+    env["RAG_CHUNK_STORE_PATH"] = os.path.join(work_dir, "chunk_store.sqlite")
+    env["RAG_METADATA_PATH"] = os.path.join(work_dir, "chunk_metadata.json")
+    env["RAG_MANIFEST_PATH"] = os.path.join(work_dir, "index_manifest.json")
+    env["RAG_EMBEDDING_CACHE_PATH"] = os.path.join(work_dir, "embedding_cache.sqlite")
+    env["RAG_BM25_PATH"] = os.path.join(work_dir, "bm25_index.npz")
+    env["RAG_FULL_VECTORS_PATH"] = os.path.join(work_dir, "vectors_f32.bin")
+    return env
+
+
+def child(mode, query, think_time):
+    """Runs inside the measured interpreter; prints one JSON line."""
+    timings = {}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        from main import run_pipeline
+        from utils.warmup import warm_up
+    timings["import_s"] = time.perf_counter() - START
+
+    if mode == "background":
+        with quiet:
+            warm_up(background=True)
+        time.sleep(think_time)
+    elif mode == "eager":
+        with quiet:
+            warm_up(background=False)
+    timings["ready_s"] = time.perf_counter() - START
+
+    asked = time.perf_counter()
+    with quiet:
+        run_pipeline([], query)
+    timings["first_answer_s"] = time.perf_counter() - asked
+    timings["import_to_answer_s"] = time.perf_counter() - START
+    print(json.dumps(timings))
+
+
+def measure(mode, query, think_time, env):
+    cmd = [sys.executable, "-m", "benchmarks.startup_benchmark",
+           "--child", mode, "--query", query, "--think-time", str(think_time)]
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, env=env, cwd=root, capture_output=True, text=True, check=True).stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process_s"] = time.perf_counter() - t0
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-to-first-answer startup time")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=2.0,
+                        help="seconds between startup and the question in background mode")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--query", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.query, args.think_time)
+        return
+
+    import numpy as np
+    from benchmarks.synthetic_corpus import make_corpus
+
+    work_dir = tempfile.mkdtemp(prefix="rag_startup_bench_")
+    env = bench_env(work_dir)
+    os.environ.update(env)
+    from main import index_files
+    corpus = make_corpus(os.path.join(work_dir, "corpus"), docs_per_type=1, pages=5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        index_files([d["path"] for d in corpus])
+    facts = [f for d in corpus for f in d["facts"]]
+
+    columns = ("import_s", "ready_s", "first_answer_s", "import_to_answer_s", "process_s")
+    print(f"{'mode':<11}" + "".join(f"{c:>20}" for c in columns))
+    for mode in args.modes:
+        runs = []
+        for i in range(args.repeat):
+            # A new question each run so the answer cache cannot short-circuit it.
+            query = f"{facts[i % len(facts)]['question']} ({mode} {i})"
+            runs.append(measure(mode, query, args.think_time, env))
+        medians = {c: float(np.median([r[c] for r in runs])) for c in columns}
+        print(f"{mode:<11}" + "".join(f"{medians[c]:>20.3f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
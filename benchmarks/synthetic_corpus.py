@@ -0,0 +1,134 @@
+# benchmarks/synthetic_corpus.py
+#
+# Deterministic synthetic documents in every format the IngestionAgent
+# reads (PDF, DOCX, PPTX, CSV, TXT). Each document also plants a few unique
+# "facts" so benchmarks can ask questions with a known source.
+#
+#   python -m benchmarks.synthetic_corpus --out /tmp/corpus --docs 3 --pages 20
+
+import argparse
+import os
+import random
+
+DOC_TYPES = ("pdf", "docx", "pptx", "csv", "txt")
+
+_WORDS = (
+    "model data layer attention encoder decoder token vector index query "
+    "revenue quarter forecast margin customer region product pipeline agent "
+    "protocol message retrieval context latency throughput memory storage "
+    "analysis report result method training evaluation benchmark system"
+).split()
+
+
+def sentence(rng, min_words=8, max_words=20):
+    words = rng.choices(_WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng, sentences=5):
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def make_fact(rng, doc_name, n):
+    code = f"{doc_name.upper()}-{n:03d}-{rng.randint(1000, 9999)}"
+    return {
+        "text": f"The reference code for item {n} of {doc_name} is {code}.",
+        "question": f"What is the reference code for item {n} of {doc_name}?",
+        "answer": code,
+    }
+
+
+def _pages(rng, doc_name, pages, paragraphs_per_page, facts_per_doc):
+    facts = [make_fact(rng, doc_name, n) for n in range(facts_per_doc)]
+    fact_pages = {rng.randrange(pages): f for f in facts}
+    content = []
+    for p in range(pages):
+        paras = [paragraph(rng) for _ in range(paragraphs_per_page)]
+        if p in fact_pages:
+            paras.insert(rng.randrange(len(paras) + 1), fact_pages[p]["text"])
+        content.append(paras)
+    return content, list(fact_pages.values())
+
+
+def write_pdf(path, pages):
+    import fitz
+    doc = fitz.open()
+    for paras in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), "\n\n".join(paras), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def write_docx(path, pages):
+    import docx
+    document = docx.Document()
+    for paras in pages:
+        for para in paras:
+            document.add_paragraph(para)
+    document.save(path)
+
+
+def write_pptx(path, pages):
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    layout = prs.slide_layouts[6]  # blank
+    for paras in pages:
+        slide = prs.slides.add_slide(layout)
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(6.5))
+        box.text_frame.text = "\n".join(paras)
+    prs.save(path)
+
+
+def write_txt(path, pages):
+    with open(path, "w", encoding="utf-8") as f:
+        for paras in pages:
+            f.write("\n\n".join(paras) + "\n\n")
+
+
+def write_csv(path, rng, rows, doc_name, facts_per_doc):
+    facts = [make_fact(rng, doc_name, n) for n in range(facts_per_doc)]
+    fact_rows = {rng.randrange(rows): f for f in facts}
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("row_id,region,product,quarter,revenue,notes\n")
+        for i in range(rows):
+            note = fact_rows[i]["text"] if i in fact_rows else sentence(rng, 4, 8)
+            f.write(f"{i},{rng.choice(_WORDS)},{rng.choice(_WORDS)},Q{rng.randint(1, 4)},"
+                    f"{rng.random() * 1e5:.2f},\"{note}\"\n")
+    return list(fact_rows.values())
+
+
+def make_corpus(out_dir, docs_per_type=2, pages=10, paragraphs_per_page=4, csv_rows=2000,
+                facts_per_doc=3, doc_types=DOC_TYPES, seed=0):
+    """
+    Write the corpus to out_dir and return one entry per document:
+    {"path", "doc_type", "facts": [{"text", "question", "answer"}]}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for doc_type in doc_types:
+        for i in range(docs_per_type):
+            doc_name = f"{doc_type}doc{i}"
+            path = os.path.join(out_dir, f"{doc_name}.{doc_type}")
+            if doc_type == "csv":
+                facts = write_csv(path, rng, csv_rows, doc_name, facts_per_doc)
+            else:
+                content, facts = _pages(rng, doc_name, pages, paragraphs_per_page, facts_per_doc)
+                {"pdf": write_pdf, "docx": write_docx, "pptx": write_pptx, "txt": write_txt}[doc_type](path, content)
+            corpus.append({"path": path, "doc_type": doc_type, "facts": facts})
+    return corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic multi-format corpus")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--docs", type=int, default=2, help="documents per type")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--csv-rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    corpus = make_corpus(args.out, args.docs, args.pages, csv_rows=args.csv_rows, seed=args.seed)
+    total = sum(os.path.getsize(d["path"]) for d in corpus)
+    print(f"📁 Wrote {len(corpus)} documents ({total / 1e6:.1f} MB) to {args.out}")
@@ -1,18 +1,66 @@
 # main.py
 
+import asyncio
+import os
+import queue
+import threading
+import time
 from core_mcp.mcp import MCPMessage
-from agents.ingestion_agent import run_ingestion_agent
+from agents.ingestion_agent import run_ingestion_agent, chunker_settings
 from agents.indexagent import handle_index_message
-from agents.retrieval_agent import handle_retrieval_message
-from agents.llmresponse_agent import handle_llm_message
+from agents.parallel_ingestion import ingest_files_parallel
+from agents.retrieval_agent import handle_retrieval_message, handle_retrieval_message_async, handle_retrieval_batch
+from agents.llmresponse_agent import handle_llm_message, handle_llm_message_async
+from utils.concurrency import run_cpu
+from utils.embedding import MODEL_NAME
+from utils.manifest import load_manifest, save_manifest, fingerprint, file_status, record_file, forget_file
+from utils.vector_store import get_vector_store
 
-def run_pipeline(file_paths, user_query):
-    final_answer = ""
-    context_used = []
+def _no_status(file_path, state, **info):
+    pass
 
+def index_files(file_paths, parallel=False, on_status=None):
+    """
+    Ingest and index every new or modified file in file_paths.
+    parallel=True parses files in a process pool and embeds them in batches.
+    on_status(file_path, state, **info) is called as each file moves through
+    "indexing" and ends as "skipped", "indexed" (num_chunks=...) or
+    "failed" (error=...).
+    """
+    on_status = on_status or _no_status
+    manifest = load_manifest()
+    chunker = chunker_settings()
+
+    # Step 0: Skip files whose content and settings are already indexed
+    pending = {}
     for file_path in file_paths:
+        current = fingerprint(file_path, chunker, MODEL_NAME)
+        status = file_status(manifest, file_path, current)
+        if status == "unchanged":
+            print(f"⏭️ Skipping unchanged file '{os.path.basename(file_path)}'")
+            on_status(file_path, "skipped", num_chunks=manifest["files"][os.path.abspath(file_path)].get("num_chunks"))
+            continue
+        if status == "modified":
+            # The IndexAgent replaces the previous version's chunks in place.
+            print(f"♻️ Re-indexing modified file '{os.path.basename(file_path)}'")
+        pending[file_path] = current
+
+    def committed(file_path, num_chunks):
+        record_file(manifest, file_path, pending[file_path], num_chunks)
+        save_manifest(manifest)
+        on_status(file_path, "indexed", num_chunks=num_chunks)
+
+    if parallel and len(pending) > 1:
+        for file_path in pending:
+            on_status(file_path, "indexing")
+        for file_path, error in ingest_files_parallel(list(pending), on_committed=committed):
+            on_status(file_path, "failed", error=str(error))
+        return
+
+    for file_path in pending:
         doc_type = file_path.split(".")[-1]
-        
+        on_status(file_path, "indexing")
+
         # Step 1: Ingestion
         msg1 = MCPMessage(
             sender="Main",
@@ -21,23 +69,170 @@ def run_pipeline(file_paths, user_query):
             payload={"file_path": file_path, "doc_type": doc_type}
         )
         msg2 = run_ingestion_agent(file_path)
+        if msg2.type == MCPMessage.TYPE_ERROR:
+            print(f"❌ Ingestion failed for '{file_path}': {msg2.payload['error']}")
+            on_status(file_path, "failed", error=msg2.payload["error"])
+            continue
 
         # Step 2: Indexing
         msg3 = handle_index_message(msg2)
+        committed(file_path, len(msg2.payload["chunks"]))
+
+def remove_files(file_paths):
+    """Delete documents from the index and the manifest. Returns chunks removed."""
+    manifest = load_manifest()
+    store = get_vector_store()
+    removed = 0
+    for file_path in file_paths:
+        removed += store.delete_document(file_path)
+        forget_file(manifest, file_path)
+    save_manifest(manifest)
+    return removed
+
+class BackgroundIndexer:
+    """
+    Indexes submitted files on a daemon thread so callers (the Streamlit
+    app) never wait for ingestion. Everything queued while the worker is
+    busy is indexed together as one parallel batch, and every file is
+    committed to the vector store as soon as it is done, so questions can be
+    answered from the finished files while the rest are still in progress.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._status = {}  # file path -> {"state", "num_chunks", "error", "seconds"}
+        self._started = {}  # file path -> perf_counter() when its current run began
+        self._dirty = set()  # resubmitted while being indexed: run again afterwards
+        self._thread = threading.Thread(target=self._run, name="rag-indexer", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path):
+        """Queue file_path; if it is being indexed right now, index it again afterwards."""
+        with self._lock:
+            current = self._status.get(file_path)
+            if current and current["state"] == "queued":
+                return
+            if current and current["state"] == "indexing":
+                # The running pass may already have read the old bytes.
+                self._dirty.add(file_path)
+                return
+            self._status[file_path] = {"state": "queued", "num_chunks": None, "error": None, "seconds": None}
+        self._queue.put(file_path)
+
+    def _set_status(self, file_path, state, **info):
+        with self._lock:
+            entry = self._status.setdefault(file_path, {"num_chunks": None, "error": None, "seconds": None})
+            entry["state"] = state
+            entry.update(info)
+            if state in ("indexed", "skipped", "failed"):
+                if file_path in self._started:
+                    entry["seconds"] = time.perf_counter() - self._started.pop(file_path)
+                if file_path in self._dirty:  # resubmitted meanwhile: stays pending for the re-run
+                    entry.update(state="queued", seconds=None, error=None)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        batch = list(dict.fromkeys(batch))
+        with self._lock:
+            now = time.perf_counter()
+            for file_path in batch:
+                self._status[file_path]["state"] = "indexing"
+                self._started[file_path] = now
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                index_files(batch, parallel=True, on_status=self._set_status)
+            except Exception as e:
+                print(f"❌ Background indexing failed for {len(batch)} file(s): {e}")
+                for file_path in batch:
+                    if self._status[file_path]["state"] == "indexing":
+                        self._set_status(file_path, "failed", error=str(e))
+            with self._lock:
+                rerun = [p for p in batch if p in self._dirty]
+                self._dirty.difference_update(rerun)
+            for file_path in rerun:
+                self._queue.put(file_path)
+
+    def status(self):
+        """Snapshot of {file path: status dict} in submission order."""
+        with self._lock:
+            return {path: dict(entry) for path, entry in self._status.items()}
+
+    def pending(self):
+        return sum(entry["state"] in ("queued", "indexing") for entry in self.status().values())
+
+def run_pipeline(file_paths, user_query, parallel=False, stream=False, filters=None):
+    """
+    Returns (answer, context_used). With stream=True the answer is a token
+    generator instead of a string. filters restricts retrieval, e.g.
+    {"source_file": ["report.pdf"], "doc_type": "pdf", "page_range": (3, 7)};
+    "source_path" matches absolute paths instead of file names.
+    """
+    final_answer = ""
+    context_used = []
+
+    # Steps 0-2: Ingestion + indexing of new/modified files
+    index_files(file_paths, parallel=parallel)
 
     # Step 3: Retrieval (after all files indexed)
     msg4 = MCPMessage(
         sender="Main",
         receiver="RetrievalAgent",
         msg_type="retrieve",
-        payload={"query": user_query}
+        payload={"query": user_query, "filters": filters}
     )
     msg5 = handle_retrieval_message(msg4)
 
     # Step 4: LLM Response
-    msg6 = handle_llm_message(msg5)
+    msg6 = handle_llm_message(msg5, stream=stream)
 
-    final_answer = msg6.payload["answer"]
     context_used = msg6.payload["context_used"]
+    if stream:
+        return msg6.payload["answer_stream"], context_used
+    final_answer = msg6.payload["answer"]
 
     return final_answer, context_used
+
+async def run_pipeline_async(file_paths, user_query, parallel=False, filters=None):
+    """
+    Asyncio variant of run_pipeline. Many calls can be awaited concurrently
+    from one process; CPU work runs in the shared executor and LLM calls
+    are capped by RAG_LLM_MAX_CONCURRENCY.
+    """
+    if file_paths:
+        await run_cpu(index_files, file_paths, parallel)
+
+    msg4 = MCPMessage(
+        sender="Main",
+        receiver="RetrievalAgent",
+        msg_type="retrieve",
+        payload={"query": user_query, "filters": filters}
+    )
+    msg5 = await handle_retrieval_message_async(msg4)
+    msg6 = await handle_llm_message_async(msg5)
+    return msg6.payload["answer"], msg6.payload["context_used"]
+
+async def answer_queries_async(file_paths, queries, parallel=False, filters=None):
+    """
+    Index file_paths once, retrieve for all queries in one batch, then
+    answer them concurrently (LLM calls capped by RAG_LLM_MAX_CONCURRENCY).
+    Returns [(answer, context_used)] in query order.
+    """
+    if file_paths:
+        await run_cpu(index_files, file_paths, parallel)
+    retrieved = await run_cpu(handle_retrieval_batch, queries, filters)
+    responses = await asyncio.gather(*(handle_llm_message_async(msg) for msg in retrieved))
+    return [(r.payload["answer"], r.payload["context_used"]) for r in responses]
+
+def answer_queries(file_paths, queries, parallel=False, filters=None):
+    """Synchronous answer_queries_async, for evaluation scripts and bulk jobs."""
+    return asyncio.run(answer_queries_async(file_paths, queries, parallel, filters))
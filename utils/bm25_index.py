@@ -0,0 +1,232 @@
+# utils/bm25_index.py
+#
+# Compact BM25 inverted index kept next to the FAISS index, for exact-term
+# matches (IDs, CSV column names, acronyms) that embeddings tend to miss.
+#
+# Postings live in numpy arrays in CSR layout, not in dicts of lists:
+#   offsets[t] : offsets[t + 1]   slice of doc_ids / tfs for term id t
+# Each append builds a small immutable segment; segments are merged when
+# there are too many of them and always before saving, so the file on disk
+# holds a single segment. Removed documents get a zero length and are
+# skipped at search time; their postings are dropped at the next merge.
+
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from utils.config import BM25_PATH
+
+K1 = 1.2
+B = 0.75
+MAX_SEGMENTS = 8
+
+_TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were what when where which who why will with how does do".split()
+)
+
+
+def tokenize(text):
+    """Lowercased terms; compound tokens (ab-12, col_name) also yield their parts."""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = re.split(r"[-./_]", token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p and p not in STOPWORDS)
+    return terms
+
+
+class _Segment:
+    __slots__ = ("offsets", "doc_ids", "tfs")
+
+    def __init__(self, offsets, doc_ids, tfs):
+        self.offsets, self.doc_ids, self.tfs = offsets, doc_ids, tfs
+
+    @classmethod
+    def from_triples(cls, term_ids, doc_ids, tfs, vocab_size):
+        order = np.argsort(term_ids, kind="stable")
+        counts = np.bincount(term_ids, minlength=vocab_size)
+        offsets = np.zeros(vocab_size + 1, dtype="int64")
+        np.cumsum(counts, out=offsets[1:])
+        return cls(offsets, doc_ids[order].astype("int64"), tfs[order].astype("float32"))
+
+    def triples(self):
+        term_ids = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        return term_ids, self.doc_ids, self.tfs
+
+    def postings(self, term_id):
+        if term_id + 1 >= len(self.offsets):
+            return None, None
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+
+class BM25Index:
+    def __init__(self, path=BM25_PATH):
+        self.path = path
+        self.vocab = {}  # term -> term id
+        self.df = np.zeros(0, dtype="int64")
+        self.doc_lens = np.zeros(0, dtype="float32")  # indexed by vector id, 0 = no document
+        self.num_docs = 0
+        self.total_len = 0.0
+        self.segments = []
+
+    # ---------- building ----------
+
+    def _term_id(self, term):
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+        return term_id
+
+    def add(self, ids, texts):
+        term_ids, doc_ids, tfs, lens = [], [], [], []
+        for doc_id, text in zip(ids, texts):
+            terms = tokenize(text)
+            lens.append(len(terms))
+            for term, tf in Counter(terms).items():
+                term_ids.append(self._term_id(term))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        ids = np.asarray(list(ids), dtype="int64")
+        if len(ids) and ids.max() >= len(self.doc_lens):
+            grown = np.zeros(max(int(ids.max()) + 1, 2 * len(self.doc_lens)), dtype="float32")
+            grown[:len(self.doc_lens)] = self.doc_lens
+            self.doc_lens = grown
+        self.doc_lens[ids] = lens
+        self.num_docs += sum(1 for n in lens if n)  # empty chunks are never matched
+        self.total_len += float(sum(lens))
+
+        if len(self.df) < len(self.vocab):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype="int64")])
+        if term_ids:
+            term_ids = np.asarray(term_ids, dtype="int64")
+            np.add.at(self.df, term_ids, 1)
+            self.segments.append(_Segment.from_triples(
+                term_ids, np.asarray(doc_ids), np.asarray(tfs), len(self.vocab)))
+        if len(self.segments) > MAX_SEGMENTS:
+            self._merge_segments()
+
+    def remove(self, ids, texts):
+        """Forget documents ids; texts are their contents, needed to update df."""
+        dropped, df_drop = [], Counter()
+        for doc_id, text in zip(ids, texts):
+            if doc_id < len(self.doc_lens) and self.doc_lens[doc_id] > 0:
+                dropped.append(doc_id)
+                df_drop.update(set(tokenize(text)))
+        for term, count in df_drop.items():
+            term_id = self.vocab.get(term)
+            if term_id is not None:
+                self.df[term_id] = max(0, self.df[term_id] - count)
+        dropped = np.asarray(dropped, dtype="int64")
+        self.total_len -= float(self.doc_lens[dropped].sum())
+        self.num_docs -= len(dropped)
+        self.doc_lens[dropped] = 0
+
+    def _merge_segments(self, force=False):
+        if len(self.segments) <= 1 and not force:
+            return
+        if not self.segments:
+            return
+        parts = [seg.triples() for seg in self.segments]
+        term_ids = np.concatenate([p[0] for p in parts])
+        doc_ids = np.concatenate([p[1] for p in parts])
+        tfs = np.concatenate([p[2] for p in parts])
+        live = self.doc_lens[doc_ids] > 0
+        self.segments = [_Segment.from_triples(term_ids[live], doc_ids[live], tfs[live], len(self.vocab))]
+
+    def compact(self):
+        """Drop the postings of removed documents."""
+        self._merge_segments(force=True)
+
+    # ---------- search ----------
+
+    def term_stats(self, query):
+        """(num_docs, total_len, {term: df}) for the query terms; summed over shards for global BM25."""
+        dfs = {}
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            dfs[term] = int(self.df[term_id]) if term_id is not None else 0
+        return self.num_docs, self.total_len, dfs
+
+    def search(self, query, k, stats=None, mask=None):
+        """
+        Return up to k (score, doc_id) pairs, best first. When this index is
+        one shard of several, pass the summed term_stats() of all shards so
+        scores are comparable across shards. mask (boolean array indexed
+        by doc id) restricts scoring to the documents set in it.
+        """
+        num_docs, total_len, dfs = stats or self.term_stats(query)
+        if not num_docs or not self.num_docs:
+            return []
+        avgdl = total_len / num_docs
+        doc_parts, score_parts = [], []
+        for term, df in dfs.items():
+            term_id = self.vocab.get(term)
+            if term_id is None or not df:
+                continue
+            idf = np.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+            for seg in self.segments:
+                docs, tfs = seg.postings(term_id)
+                if docs is None or not len(docs):
+                    continue
+                dl = self.doc_lens[docs]
+                live = dl > 0
+                if mask is not None:
+                    live &= mask[np.minimum(docs, len(mask) - 1)] & (docs < len(mask))
+                docs, tfs, dl = docs[live], tfs[live], dl[live]
+                doc_parts.append(docs)
+                score_parts.append(idf * tfs * (K1 + 1) / (tfs + K1 * (1 - B + B * dl / avgdl)))
+        if not doc_parts:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(float(scores[i]), int(docs[i])) for i in top]
+
+    # ---------- persistence ----------
+
+    def save(self, path=None):
+        path = path or self.path
+        self._merge_segments()
+        seg = self.segments[0] if self.segments else _Segment(np.zeros(len(self.vocab) + 1, dtype="int64"),
+                                                              np.zeros(0, dtype="int64"),
+                                                              np.zeros(0, dtype="float32"))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype="uint8"),
+            df=self.df,
+            doc_lens=self.doc_lens,
+            stats=np.array([self.num_docs, self.total_len], dtype="float64"),
+            offsets=seg.offsets,
+            doc_ids=seg.doc_ids,
+            tfs=seg.tfs,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=BM25_PATH):
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            raw = data["terms"].tobytes().decode("utf-8")
+            terms = raw.split("\n") if raw else []
+            index.vocab = {term: i for i, term in enumerate(terms)}
+            index.df = data["df"]
+            index.doc_lens = data["doc_lens"]
+            index.num_docs = int(data["stats"][0])
+            index.total_len = float(data["stats"][1])
+            if len(data["doc_ids"]):
+                index.segments = [_Segment(data["offsets"], data["doc_ids"], data["tfs"])]
+        return index
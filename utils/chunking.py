@@ -0,0 +1,135 @@
+# utils/chunking.py
+#
+# Token-aware chunkers shared by the ingestion path and the benchmarks.
+# Streaming chunkers consume (page, text) segments and yield
+# {"chunk", "page_start", "page_end"} dicts. Only about one window of tokens
+# is buffered at a time, and windows overlap across page boundaries just
+# like within a page.
+
+import functools
+
+# Optional: use tiktoken for better chunking
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+ENCODING_NAME = "cl100k_base"
+CHUNK_MAX_TOKENS = 300
+CHUNK_OVERLAP = 50
+CHUNK_SENTENCE_AWARE = True
+SENTENCE_MIN_FILL = 0.75  # a window may end early at a sentence end, but not before 75% full
+CHARS_PER_TOKEN = 4  # token estimate when tiktoken is unavailable
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(name=ENCODING_NAME):
+    """Process-wide tiktoken encoder; loading the BPE ranks is expensive."""
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text):
+    if HAS_TIKTOKEN:
+        return len(get_encoder().encode_ordinary(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _ends_sentence(token):
+    piece = get_encoder().decode_single_token_bytes(token).rstrip(b" \t")
+    return piece.endswith((b".", b"!", b"?", b"\n"))
+
+
+def _window_end(tokens, max_tokens, sentence_aware):
+    if sentence_aware:
+        for i in range(max_tokens - 1, int(max_tokens * SENTENCE_MIN_FILL) - 1, -1):
+            if _ends_sentence(tokens[i]):
+                return i + 1
+    return max_tokens
+
+
+def _page_range(pages):
+    known = [p for p in pages if p is not None]
+    if not known:
+        return {}
+    return {"page_start": min(known), "page_end": max(known)}
+
+
+def _decode_windows(enc, windows):
+    if not windows:
+        return
+    texts = enc.decode_batch([tokens for tokens, _ in windows])
+    for text, (_, pages) in zip(texts, windows):
+        text = text.strip()
+        if text:
+            yield {"chunk": text, **_page_range(pages)}
+
+
+def stream_chunks_tiktoken(segments, max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP,
+                           sentence_aware=CHUNK_SENTENCE_AWARE):
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    enc = get_encoder()
+    tokens, pages = [], []
+    fresh = 0  # trailing tokens not yet covered by an emitted window
+
+    for page, text in segments:
+        seg_tokens = enc.encode_ordinary(text + "\n")
+        tokens.extend(seg_tokens)
+        pages.extend([page] * len(seg_tokens))
+        fresh += len(seg_tokens)
+
+        # Cut every full window available in this segment, decode them together.
+        windows = []
+        while len(tokens) >= max_tokens:
+            end = _window_end(tokens, max_tokens, sentence_aware)
+            windows.append((tokens[:end], pages[:end]))
+            fresh = len(tokens) - end
+            cut = max(end - overlap, 1)
+            del tokens[:cut]
+            del pages[:cut]
+        yield from _decode_windows(enc, windows)
+
+    if fresh > 0:
+        yield from _decode_windows(enc, [(tokens, pages)])
+
+
+def stream_chunks_line(segments, max_tokens=CHUNK_MAX_TOKENS):
+    """Pack whole lines into chunks of at most max_tokens tokens."""
+    current, current_tokens, pages = [], 0, []
+    for page, text in segments:
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            n = count_tokens(line)
+            if current and current_tokens + n > max_tokens:
+                yield {"chunk": " ".join(current), **_page_range(pages)}
+                current, current_tokens, pages = [], 0, []
+            current.append(line)
+            current_tokens += n
+            pages.append(page)
+    if current:
+        yield {"chunk": " ".join(current), **_page_range(pages)}
+
+
+def split_into_chunks_tiktoken(text, max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP, sentence_aware=False):
+    return [c["chunk"] for c in stream_chunks_tiktoken([(None, text)], max_tokens, overlap, sentence_aware)]
+
+
+def split_into_chunks_line(text, max_tokens=CHUNK_MAX_TOKENS):
+    return [c["chunk"] for c in stream_chunks_line([(None, text)], max_tokens)]
+
+
+def chunk_stream(segments):
+    """Chunk segments with the configured strategy."""
+    if HAS_TIKTOKEN:
+        return stream_chunks_tiktoken(segments)
+    return stream_chunks_line(segments)
+
+
+def strategy_name():
+    if HAS_TIKTOKEN:
+        return "tiktoken-sentence" if CHUNK_SENTENCE_AWARE else "tiktoken-fixed"
+    return "line-tokens"
@@ -0,0 +1,69 @@
+# utils/concurrency.py
+#
+# Shared concurrency primitives for the asyncio pipeline:
+#   run_cpu   offload CPU-bound work (embedding, FAISS search) to a thread
+#             pool; both SentenceTransformer and FAISS release the GIL.
+#   llm_slot  cap the number of in-flight LLM calls per event loop.
+#   get_shard_executor  separate pool for per-shard index searches, so a
+#             search already running on the CPU pool never waits on itself.
+
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.config import CPU_WORKERS, LLM_MAX_CONCURRENCY, SHARD_SEARCH_WORKERS
+
+_cpu_executor = None
+_shard_executor = None
+_executor_lock = threading.Lock()
+_llm_semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+
+
+def get_cpu_executor():
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _executor_lock:
+            if _cpu_executor is None:
+                _cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="rag-cpu")
+    return _cpu_executor
+
+
+def get_shard_executor():
+    global _shard_executor
+    if _shard_executor is None:
+        with _executor_lock:
+            if _shard_executor is None:
+                _shard_executor = ThreadPoolExecutor(max_workers=SHARD_SEARCH_WORKERS, thread_name_prefix="rag-shard")
+    return _shard_executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def llm_slot(limit=LLM_MAX_CONCURRENCY):
+    """
+    Semaphore bounding concurrent LLM calls on the running loop:
+        async with llm_slot():
+            answer = await call_llm_async(prompt)
+    """
+    return loop_local(_llm_semaphores, lambda: asyncio.Semaphore(limit))
+
+
+def loop_local(registry, factory):
+    """
+    Per-event-loop value from a WeakKeyDictionary keyed by loop, created with
+    factory() on first use. Every asyncio.run() makes a new loop; entries of
+    closed loops are dropped here because a value that references its loop
+    (a Semaphore that has waited, a client's connections) keeps it alive.
+    """
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in list(registry) if other.is_closed()]:
+        registry.pop(stale, None)
+    value = registry.get(loop)
+    if value is None:
+        value = registry[loop] = factory()
+    return value
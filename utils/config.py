@@ -0,0 +1,100 @@
+# utils/config.py
+#
+# Central place for on-disk locations and tuning knobs shared by the agents.
+# Every value can be overridden through the environment (or the .env file).
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INDEX_PATH = os.getenv("RAG_INDEX_PATH", "vector_index.faiss")
+METADATA_PATH = os.getenv("RAG_METADATA_PATH", "chunk_metadata.json")  # legacy, migrated on first use
+CHUNK_STORE_PATH = os.getenv("RAG_CHUNK_STORE_PATH", "chunk_store.sqlite")
+MANIFEST_PATH = os.getenv("RAG_MANIFEST_PATH", "index_manifest.json")
+# Uploaded files are kept here by name, so a re-upload replaces the indexed copy.
+UPLOAD_DIR = os.getenv("RAG_UPLOAD_DIR", "uploads")
+
+EMBEDDING_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE_PATH", "embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("RAG_EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# FAISS index selection. The store starts as an exact IndexFlatL2 and is
+# promoted to ANN_INDEX_TYPE once it holds ANN_PROMOTE_AT vectors
+# ("flat" disables promotion).
+ANN_INDEX_TYPE = os.getenv("RAG_ANN_INDEX_TYPE", "hnsw")
+ANN_PROMOTE_AT = int(os.getenv("RAG_ANN_PROMOTE_AT", "50000"))
+HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "0"))  # 0 = pick from corpus size
+IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("RAG_PQ_M", "48"))
+PQ_NBITS = int(os.getenv("RAG_PQ_NBITS", "8"))
+
+# Parallel ingestion: parser processes and chunks per embedding batch.
+INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH_CHUNKS = int(os.getenv("RAG_EMBED_BATCH_CHUNKS", "512"))
+
+# Query-side caches
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RAG_RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RAG_RETRIEVAL_CACHE_TTL", "600"))  # seconds, 0 = no expiry
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+
+# Semantic answer cache in front of the LLM
+ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+
+# Async pipeline
+CPU_WORKERS = int(os.getenv("RAG_CPU_WORKERS", str(min(8, os.cpu_count() or 1))))
+LLM_MAX_CONCURRENCY = int(os.getenv("RAG_LLM_MAX_CONCURRENCY", "8"))
+
+# LLM backends: "gemini", "openai" (any OpenAI-compatible HTTP server) or "stub"
+LLM_BACKEND = os.getenv("RAG_LLM_BACKEND", "gemini")
+GEMINI_MODEL = os.getenv("RAG_GEMINI_MODEL", "gemini-2.0-flash")
+OPENAI_MODEL = os.getenv("RAG_OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None = api.openai.com
+LLM_TIMEOUT = float(os.getenv("RAG_LLM_TIMEOUT", "60"))  # seconds per attempt
+LLM_MAX_RETRIES = int(os.getenv("RAG_LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("RAG_LLM_BACKOFF_BASE", "0.5"))  # seconds, doubled per retry
+LLM_HEDGE_AFTER = float(os.getenv("RAG_LLM_HEDGE_AFTER", "0"))  # seconds, 0 = no hedging
+STUB_TOKEN_DELAY = float(os.getenv("RAG_STUB_TOKEN_DELAY", "0.02"))
+
+# Context assembly for the LLM prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_ORDER = os.getenv("RAG_CONTEXT_ORDER", "mmr")  # "mmr" or "relevance"
+MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+NEAR_DUPLICATE_JACCARD = float(os.getenv("RAG_NEAR_DUPLICATE_JACCARD", "0.9"))
+
+# Hybrid retrieval (BM25 inverted index fused with vector search)
+BM25_PATH = os.getenv("RAG_BM25_PATH", "bm25_index.npz")
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")  # "hybrid" or "vector"
+RETRIEVAL_K = int(os.getenv("RAG_RETRIEVAL_K", "10"))
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+# Startup: load the embedding model, index and LLM client in a background
+# thread as soon as the app starts, instead of on the first question
+WARMUP = os.getenv("RAG_WARMUP", "1") == "1"
+
+# Vector precision: "float32", "fp16" or "int8" scalar quantization (2x / 4x
+# less memory). int8 stays float32 until QUANT_MIN_TRAIN vectors are available
+# to learn its value ranges. With RAG_QUANT_RESCORE=1 the top
+# RESCORE_FACTOR * k candidates are re-ranked with exact float32 vectors kept
+# in a memory-mapped file on disk, not in RAM.
+VECTOR_STORAGE = os.getenv("RAG_VECTOR_STORAGE", "float32")
+QUANT_MIN_TRAIN = int(os.getenv("RAG_QUANT_MIN_TRAIN", "10000"))
+QUANT_RESCORE = os.getenv("RAG_QUANT_RESCORE", "0") == "1"
+RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+FULL_VECTORS_PATH = os.getenv("RAG_FULL_VECTORS_PATH", "vectors_f32.bin")
+
+# Deleted vectors are hidden at search time and physically dropped once they
+# make up this fraction of the index (or on VectorStore.compact()).
+COMPACT_RATIO = float(os.getenv("RAG_COMPACT_RATIO", "0.2"))
+
+# Index shards (size bands): new documents go to the newest shard until it
+# holds SHARD_MAX_VECTORS vectors, then a new shard file is started. Searches
+# fan out over the shards on a thread pool.
+SHARD_MAX_VECTORS = int(os.getenv("RAG_SHARD_MAX_VECTORS", "250000"))
+SHARD_SEARCH_WORKERS = int(os.getenv("RAG_SHARD_SEARCH_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Resolved search filters (id bitmaps per shard) kept until the index changes
+FILTER_CACHE_SIZE = int(os.getenv("RAG_FILTER_CACHE_SIZE", "32"))
@@ -0,0 +1,147 @@
+# utils/context_packing.py
+#
+# Turns the retrieved chunks into the context block of the LLM prompt:
+#   1. drop exact and near-duplicate chunks (re-indexed files, repeated text)
+#   2. merge overlapping windows that are adjacent in the same source file
+#   3. order by retrieval rank or by maximal marginal relevance (MMR)
+#   4. pack into a token budget
+
+import re
+
+import numpy as np
+
+from utils.chunking import count_tokens
+from utils.config import CONTEXT_TOKEN_BUDGET, CONTEXT_ORDER, MMR_LAMBDA, NEAR_DUPLICATE_JACCARD
+
+
+def _shingles(text, n=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < n:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def merge_overlapping(first, second, probe=12):
+    """Join two consecutive windows, dropping the text they share."""
+    head = second[:probe]
+    pos = first.find(head) if head else -1
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return first[:pos] + second
+        pos = first.find(head, pos + 1)
+    return first + " " + second
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def mmr_order(query_embedding, embeddings, mmr_lambda=MMR_LAMBDA):
+    """Indices of embeddings in maximal-marginal-relevance order."""
+    docs = _unit_rows(np.asarray(embeddings, dtype="float32"))
+    query = _unit_rows(np.asarray(query_embedding, dtype="float32").reshape(1, -1))[0]
+    relevance = docs @ query
+    similarity = docs @ docs.T
+
+    order, remaining = [], list(range(len(docs)))
+    while remaining:
+        if order:
+            redundancy = similarity[np.ix_(remaining, order)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        order.append(best)
+        remaining.remove(best)
+    return order
+
+
+def pack_context(chunks, metadata=None, query_embedding=None, chunk_embeddings=None,
+                 token_budget=CONTEXT_TOKEN_BUDGET, order=CONTEXT_ORDER,
+                 near_duplicate=NEAR_DUPLICATE_JACCARD):
+    """
+    chunks are in retrieval rank order; metadata[i] may carry "id" and
+    "source_file" for chunk i. MMR ordering needs query_embedding and
+    chunk_embeddings, otherwise rank order is used.
+    Returns (packed_texts, report).
+    """
+    metadata = metadata or [{} for _ in chunks]
+    items = []
+    for rank, (text, meta) in enumerate(zip(chunks, metadata)):
+        items.append({
+            "text": text,
+            "rank": rank,
+            "ids": [meta["id"]] if meta.get("id") is not None else [],
+            "source_file": meta.get("source_file"),
+            "members": [rank],
+            "parts": [text],
+            "shingles": _shingles(text),
+        })
+
+    # 1. duplicates: keep the best-ranked copy
+    kept, duplicates = [], 0
+    for item in items:
+        if any(_jaccard(item["shingles"], k["shingles"]) >= near_duplicate for k in kept):
+            duplicates += 1
+        else:
+            kept.append(item)
+
+    # 2. adjacent windows of the same file (consecutive vector ids), as long
+    #    as the merged text still fits the budget on its own
+    kept.sort(key=lambda it: (str(it["source_file"]), it["ids"][0] if it["ids"] else -1, it["rank"]))
+    merged_items, merges = [], 0
+    for item in kept:
+        prev = merged_items[-1] if merged_items else None
+        merged_text = None
+        if (prev and item["ids"] and prev["ids"]
+                and item["source_file"] == prev["source_file"]
+                and item["ids"][0] == prev["ids"][-1] + 1):
+            merged_text = merge_overlapping(prev["text"], item["text"])
+            if count_tokens(merged_text) > token_budget:
+                merged_text = None
+        if merged_text is not None:
+            prev["text"] = merged_text
+            prev["parts"].extend(item["parts"])
+            prev["ids"].extend(item["ids"])
+            prev["members"].extend(item["members"])
+            prev["rank"] = min(prev["rank"], item["rank"])
+            merges += 1
+        else:
+            merged_items.append(item)
+
+    # 3. ordering
+    merged_items.sort(key=lambda it: it["rank"])
+    if order == "mmr" and query_embedding is not None and chunk_embeddings is not None and merged_items:
+        emb = np.asarray(chunk_embeddings, dtype="float32")
+        pooled = np.vstack([emb[it["members"]].mean(axis=0) for it in merged_items])
+        merged_items = [merged_items[i] for i in mmr_order(query_embedding, pooled)]
+
+    # 4. token budget; a merged window that no longer fits falls back to its parts
+    packed, used = [], 0
+    for item in merged_items:
+        tokens = count_tokens(item["text"])
+        if used + tokens <= token_budget:
+            packed.append(item["text"])
+            used += tokens
+            continue
+        for part in item["parts"] if len(item["parts"]) > 1 else ():
+            tokens = count_tokens(part)
+            if used + tokens <= token_budget:
+                packed.append(part)
+                used += tokens
+
+    report = {
+        "chunks_retrieved": len(chunks),
+        "duplicates_dropped": duplicates,
+        "windows_merged": merges,
+        "chunks_packed": len(packed),
+        "context_tokens": used,
+        "token_budget": token_budget,
+        "order": order,
+    }
+    return packed, report
@@ -1,9 +1,125 @@
 # utils/embedding.py
 
-from sentence_transformers import SentenceTransformer
+import threading
 
-model = SentenceTransformer("all-mpnet-base-v2")  # 768-dimensional output
+import numpy as np
+
+MODEL_NAME = "all-mpnet-base-v2"
+EMBEDDING_BATCH_SIZE = 64
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    The SentenceTransformer, loaded on first use rather than at import so
+    that importing the pipeline (and every Streamlit rerun) stays cheap.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)  # 768-dimensional output
+    return _model
 
 def get_embedding(text):
-    embedding = model.encode(text)
+    embedding = get_model().encode(text)
     return embedding.tolist()
+
+def get_embeddings(texts, batch_size=EMBEDDING_BATCH_SIZE, normalize=False, sort_by_length=True):
+    """
+    Embed many texts with batched model.encode calls.
+    Returns a float32 array of shape (len(texts), dim) in input order.
+    Sorting by length keeps each batch's padding small.
+    """
+    texts = list(texts)
+    model = get_model()
+    dim = model.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(texts), dim), dtype="float32")
+    if not texts:
+        return embeddings
+
+    if sort_by_length:
+        order = np.argsort([len(t) for t in texts], kind="stable")[::-1]
+    else:
+        order = np.arange(len(texts))
+
+    for start in range(0, len(texts), batch_size):
+        batch_idx = order[start:start + batch_size]
+        embeddings[batch_idx] = model.encode(
+            [texts[i] for i in batch_idx],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=normalize,
+        )
+    return embeddings
+
+_embedding_cache = None
+
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None:
+        from utils.embedding_cache import EmbeddingCache
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
+
+def get_embeddings_cached(texts, cache=None, **kwargs):
+    """
+    Same as get_embeddings, but only cache misses are sent to the model.
+    """
+    texts = list(texts)
+    cache = cache or get_embedding_cache()
+    found = cache.get_many(MODEL_NAME, texts)
+
+    missing = [i for i in range(len(texts)) if i not in found]
+    # Fully cached batches never need the model, not even to learn its dimension.
+    if found:
+        dim = len(next(iter(found.values())))
+    else:
+        dim = get_model().get_sentence_embedding_dimension()
+    embeddings = np.empty((len(texts), dim), dtype="float32")
+    for pos, vector in found.items():
+        embeddings[pos] = vector
+
+    if missing:
+        computed = get_embeddings([texts[i] for i in missing], **kwargs)
+        embeddings[missing] = computed
+        cache.put_many(MODEL_NAME, [texts[i] for i in missing], computed)
+    return embeddings
+
+_query_embedding_cache = None
+
+def _query_cache():
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        from utils.cache import LRUCache
+        from utils.config import QUERY_EMBEDDING_CACHE_SIZE
+        _query_embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+    return _query_embedding_cache
+
+def get_query_embedding(query):
+    """
+    Embed a single query as a (1, dim) float32 array, memoized so repeated
+    questions skip the model entirely.
+    """
+    return get_query_embeddings([query])[0:1]
+
+def get_query_embeddings(queries):
+    """
+    Embed many queries as an (N, dim) float32 array. Memoized queries skip
+    the model; the rest are encoded together in batches.
+    """
+    cache = _query_cache()
+    keys = [" ".join(q.split()) for q in queries]
+    vectors = {key: cache.get(key) for key in keys}
+    missing = [key for key, vector in vectors.items() if vector is None]
+    if missing:
+        for key, vector in zip(missing, get_embeddings(missing)):
+            vector = vector[None, :]
+            vector.setflags(write=False)
+            cache.put(key, vector)
+            vectors[key] = vector
+    if not keys:
+        return np.empty((0, get_model().get_sentence_embedding_dimension()), dtype="float32")
+    return np.concatenate([vectors[key] for key in keys])
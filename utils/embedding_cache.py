@@ -0,0 +1,168 @@
+# utils/embedding_cache.py
+#
+# Disk-backed embedding cache. Vectors are stored in SQLite keyed by a hash of
+# (model name, normalized chunk text), so re-uploading the same or overlapping
+# documents only encodes chunks that were never seen before.
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from utils.config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+_SQL_BATCH = 500  # stay below SQLite's bound-variable limit
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+def cache_key(model_name, text):
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Size-bounded SQLite store of float32 embeddings.
+    Least recently used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def get_many(self, model_name, texts):
+        """Return {position: vector} for every text already in the cache."""
+        keys = [cache_key(model_name, t) for t in texts]
+        positions = {}
+        for pos, key in enumerate(keys):
+            positions.setdefault(key, []).append(pos)
+
+        found = {}
+        unique_keys = list(positions)
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique_keys), _SQL_BATCH):
+                batch = unique_keys[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype="float32")
+                    for pos in positions[key]:
+                        found[pos] = vector
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows],
+                    )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, model_name, texts, vectors):
+        vectors = np.asarray(vectors, dtype="float32")
+        now = time.time()
+        rows = {
+            cache_key(model_name, t): (model_name, vectors.shape[1], v.tobytes(), now)
+            for t, v in zip(texts, vectors)
+        }
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(key, *row) for key, row in rows.items()],
+            )
+            self._count += self._conn.total_changes - before
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN"
+            " (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate(), 4),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def prewarm_from_index(cache, model_name, index_path, metadata_store):
+    """
+    Seed the cache from every shard of an existing FAISS index and its chunk
+    metadata (a legacy chunk_metadata.json is migrated by MetadataStore on
+    open). Each stored vector is the embedding of the record with the same
+    id. Quantized shards are skipped: their decoded vectors are not the
+    exact embeddings and must not be reused as such.
+    """
+    import faiss
+    from utils.index_factory import storage_of, vectors_and_ids
+    from utils.vector_store import shard_index_files
+
+    added = 0
+    for shard, path in shard_index_files(index_path).items():
+        index = faiss.read_index(path)
+        if storage_of(index) != "float32":
+            print(f"⚠️ Not pre-warming from shard {shard}: {storage_of(index)} vectors are not exact")
+            continue
+        vectors, ids = vectors_and_ids(index)
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = slice(start, start + _SQL_BATCH)
+            records = metadata_store.get_many(ids[batch])
+            live = [i for i, r in enumerate(records) if r is not None]  # deleted chunks have no record
+            if not live:
+                continue
+            cache.put_many(model_name, [records[i]["chunk"] for i in live], vectors[batch][live])
+            added += len(live)
+    return added
+
+if __name__ == "__main__":
+    from utils.config import INDEX_PATH
+    from utils.embedding import MODEL_NAME
+    from utils.metadata_store import MetadataStore
+
+    cache = EmbeddingCache()
+    added = prewarm_from_index(cache, MODEL_NAME, INDEX_PATH, MetadataStore())
+    print(f"🔥 Pre-warmed embedding cache with {added} chunks | {cache.stats()}")
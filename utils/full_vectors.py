@@ -0,0 +1,74 @@
+# utils/full_vectors.py
+#
+# Exact float32 copies of the vectors for re-scoring results from a
+# quantized index. They live in a flat file (row i = vector id i, one file
+# per index shard) that is memory-mapped for reads, so only the pages of
+# the candidates looked at are ever paged into RAM.
+
+import os
+
+import numpy as np
+
+from utils.config import FULL_VECTORS_PATH
+
+ROW_DTYPE = np.dtype("float32")
+
+
+class FullVectorFile:
+    def __init__(self, path=FULL_VECTORS_PATH):
+        self.path = path
+        self._matrix = None
+
+    def write_at(self, ids, vectors):
+        """
+        Write vectors[i] as row ids[i], one write per run of consecutive ids.
+        Rows never written (ids of other shards, deleted ids) read as zeros
+        and are never looked up.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=ROW_DTYPE)
+        ids = np.asarray(ids, dtype="int64")
+        if not len(ids):
+            return
+        row_bytes = vectors.shape[1] * ROW_DTYPE.itemsize
+        run_starts = np.concatenate([[0], np.flatnonzero(np.diff(ids) != 1) + 1, [len(ids)]])
+        with open(self.path, "r+b" if os.path.exists(self.path) else "wb") as f:
+            for begin, end in zip(run_starts[:-1], run_starts[1:]):
+                f.seek(int(ids[begin]) * row_bytes)
+                f.write(vectors[begin:end].tobytes())
+        self._matrix = None
+
+    def matrix(self, dim, min_rows=0):
+        """
+        Read-only (rows, dim) memmap of the file, or None if it is empty.
+        Re-mapped when another writer has grown the file past the mapping.
+        """
+        matrix = self._matrix
+        if matrix is None or matrix.shape[1] != dim or len(matrix) < min_rows:
+            rows = (os.path.getsize(self.path) if os.path.exists(self.path) else 0) // (dim * ROW_DTYPE.itemsize)
+            if not rows:
+                return None
+            matrix = self._matrix = np.memmap(self.path, dtype=ROW_DTYPE, mode="r", shape=(rows, dim))
+        return matrix
+
+    def covers(self, ntotal, dim):
+        matrix = self.matrix(dim, min_rows=ntotal)
+        return matrix is not None and len(matrix) >= ntotal
+
+def rescore(query_vectors, candidate_ids, lookup, k):
+    """
+    Re-rank each row of candidate_ids (-1 = empty slot) by exact L2 distance.
+    lookup(ids) returns the float32 vectors for ids. Returns (distances, ids)
+    of shape (len(query_vectors), k), padded with inf / -1 like FAISS.
+    """
+    distances = np.full((len(query_vectors), k), np.inf, dtype="float32")
+    ids = np.full((len(query_vectors), k), -1, dtype="int64")
+    for row, (query, candidates) in enumerate(zip(query_vectors, candidate_ids)):
+        candidates = candidates[candidates >= 0]
+        if not len(candidates):
+            continue
+        diff = np.asarray(lookup(candidates), dtype="float32") - query
+        exact = np.einsum("ij,ij->i", diff, diff)
+        top = np.argsort(exact, kind="stable")[:k]
+        distances[row, :len(top)] = exact[top]
+        ids[row, :len(top)] = candidates[top]
+    return distances, ids
@@ -0,0 +1,221 @@
+# utils/index_factory.py
+#
+# Builds the FAISS index types supported by the vector store:
+#   flat      exact IndexFlatL2 (brute force)
+#   hnsw      IndexHNSWFlat graph, no training needed
+#   ivf_flat  IndexIVFFlat, trained coarse quantizer + exact residual scan
+#   ivf_pq    IndexIVFPQ, trained coarse quantizer + product-quantized codes
+#
+# flat, hnsw and ivf_flat can store their vectors as float32 (default) or
+# scalar-quantized fp16 / int8 (2x / 4x smaller). int8 learns per-dimension
+# ranges and therefore needs training vectors.
+#
+# The vector store wraps every index in IndexIDMap2 so vector ids stay
+# stable when documents are deleted; helpers below look through the wrapper.
+
+import math
+
+import faiss
+import numpy as np
+
+from utils import config
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+STORAGE_TYPES = ("float32", "fp16", "int8")
+_SQ_TYPES = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+TRAIN_POINTS_PER_CENTROID = 39  # FAISS warns below this
+MAX_TRAIN_SAMPLE = 200_000
+
+
+def default_nlist(ntotal):
+    if config.IVF_NLIST:
+        return config.IVF_NLIST
+    return max(1, min(65536, int(4 * math.sqrt(max(ntotal, 1)))))
+
+
+def needs_training(index_type, storage="float32"):
+    return index_type in ("ivf_flat", "ivf_pq") or (storage == "int8" and index_type != "ivf_pq")
+
+
+def build_index(index_type, dim, train_vectors=None, storage="float32", **params):
+    """
+    Create an empty index of the requested type and storage precision,
+    trained on train_vectors when the combination requires it.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage: {storage}. Choose from {STORAGE_TYPES}")
+    if needs_training(index_type, storage) and (train_vectors is None or len(train_vectors) == 0):
+        raise ValueError(f"{index_type} index with {storage} storage needs training vectors")
+    qtype = _SQ_TYPES.get(storage)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim) if qtype is None else faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+    elif index_type == "hnsw":
+        hnsw_m = params.get("hnsw_m", config.HNSW_M)
+        index = faiss.IndexHNSWFlat(dim, hnsw_m) if qtype is None else faiss.IndexHNSWSQ(dim, qtype, hnsw_m)
+        index.hnsw.efConstruction = params.get("ef_construction", config.HNSW_EF_CONSTRUCTION)
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = min(params.get("nlist") or default_nlist(len(train_vectors)), len(train_vectors))
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat" and qtype is None:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        elif index_type == "ivf_flat":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_L2)
+        else:
+            pq_m = params.get("pq_m", config.PQ_M)
+            if dim % pq_m:
+                raise ValueError(f"PQ sub-quantizers ({pq_m}) must divide the dimension ({dim})")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, params.get("pq_nbits", config.PQ_NBITS))
+        index.own_fields = True
+        quantizer.this.disown()
+    else:
+        raise ValueError(f"Unknown index type: {index_type}. Choose from {INDEX_TYPES}")
+
+    if not index.is_trained:
+        index.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+    if isinstance(index, faiss.IndexIVF):
+        # Keep reconstruct() available (used e.g. to pre-warm the embedding cache).
+        index.make_direct_map()
+    configure_search(index, **params)
+    return index
+
+
+def unwrap(index):
+    """The index inside an IndexIDMap/IndexIDMap2, or index itself."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def is_id_mapped(index):
+    return isinstance(faiss.downcast_index(index), (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+
+def with_ids(index):
+    """Wrap an empty index in IndexIDMap2 (which takes ownership of it)."""
+    wrapped = faiss.IndexIDMap2(index)
+    wrapped.own_fields = True
+    index.this.disown()
+    return wrapped
+
+
+def configure_search(index, **params):
+    """Apply query-time parameters; these are not all kept by write_index."""
+    ps = faiss.ParameterSpace()
+    inner = unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        ps.set_index_parameter(index, "efSearch", params.get("ef_search", config.HNSW_EF_SEARCH))
+    elif isinstance(inner, faiss.IndexIVF):
+        ps.set_index_parameter(index, "nprobe", params.get("nprobe", config.IVF_NPROBE))
+    return index
+
+
+def search_params(index, selector=None):
+    """
+    SearchParameters for index carrying an IDSelector. HNSW and IVF need
+    their own subclass, so the configured efSearch / nprobe are copied in.
+    """
+    inner = unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def supports_remove(index):
+    # Only flat storage compacts itself the way IndexIDMap2.remove_ids expects
+    # (IVF keeps positions, HNSW cannot drop nodes); the rest are rebuilt.
+    return index_type_of(index) == "flat"
+
+
+def ids_of(index):
+    """Vector ids in storage order (positions for an index without an id map)."""
+    if is_id_mapped(index):
+        return faiss.vector_to_array(faiss.downcast_index(index).id_map).astype("int64")
+    return np.arange(index.ntotal, dtype="int64")
+
+
+def vectors_and_ids(index):
+    """All stored vectors (decoded) and their ids, in storage order."""
+    inner = unwrap(index)
+    return inner.reconstruct_n(0, inner.ntotal), ids_of(index)
+
+
+def index_type_of(index):
+    inner = unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def storage_of(index):
+    """Vector precision of an index: "float32", "fp16", "int8" or "pq"."""
+    inner = unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return storage_of(inner.storage)
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "pq"
+    if isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        for name, qtype in _SQ_TYPES.items():
+            if inner.sq.qtype == qtype:
+                return name
+        return "sq"
+    return "float32"
+
+
+def training_sample(vectors, nlist, seed=0):
+    size = min(len(vectors), max(nlist * TRAIN_POINTS_PER_CENTROID, 10_000), MAX_TRAIN_SAMPLE)
+    if size >= len(vectors):
+        return vectors
+    rng = np.random.default_rng(seed)
+    return vectors[np.sort(rng.choice(len(vectors), size, replace=False))]
+
+
+def build_from_vectors(index_type, vectors, storage="float32", ids=None, **params):
+    """
+    Build an index of index_type holding all of vectors (same row order).
+    With ids the result is an IndexIDMap2 using them as vector ids.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    train = None
+    if needs_training(index_type, storage):
+        if index_type in ("ivf_flat", "ivf_pq"):
+            params.setdefault("nlist", default_nlist(len(vectors)))
+        train = training_sample(vectors, params.get("nlist", 1))
+    index = build_index(index_type, vectors.shape[1], train, storage, **params)
+    if ids is None:
+        index.add(vectors)
+        return index
+    index = with_ids(index)
+    index.add_with_ids(vectors, np.ascontiguousarray(ids, dtype="int64"))
+    return index
+
+
+def target_layout(ntotal):
+    """
+    (index type, storage) the vector store should use at ntotal vectors.
+    Storage is ignored by ivf_pq, which always stores PQ codes.
+    """
+    index_type = config.ANN_INDEX_TYPE if ntotal >= config.ANN_PROMOTE_AT else "flat"
+    storage = config.VECTOR_STORAGE
+    if storage == "int8" and ntotal < config.QUANT_MIN_TRAIN:
+        storage = "float32"  # too few vectors yet to learn the int8 ranges
+    return index_type, storage
+
+
+def should_rebuild(index):
+    """
+    Target (index type, storage) if a flat index should be rebuilt: promoted
+    to the ANN type once large enough, or converted to the configured
+    storage. ANN indexes are never rebuilt automatically. None otherwise.
+    """
+    if index_type_of(index) != "flat":
+        return None
+    target = target_layout(index.ntotal)
+    return target if target != (index_type_of(index), storage_of(index)) else None
@@ -0,0 +1,375 @@
+# utils/llm_backends.py
+#
+# Pluggable LLM backends behind one interface, plus LLMClient which adds
+# per-attempt timeouts, retries with exponential backoff, optional request
+# hedging and per-backend latency statistics.
+#
+#   gemini  google-generativeai GenerativeModel (one long-lived gRPC channel)
+#   openai  any OpenAI-compatible HTTP endpoint via the openai SDK (one pooled client)
+#   stub    deterministic in-process backend for tests and benchmarks; the same
+#           answers are served over HTTP by utils/stub_llm_server.py
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from utils import config
+from utils.concurrency import loop_local
+
+GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.95,
+    "top_k": 20,
+    "max_output_tokens": 1024,
+    "stop_sequences": None
+}
+
+
+class LLMError(Exception):
+    """Raised when every attempt to reach a backend has failed."""
+
+
+def _describe(error):
+    return str(error) or type(error).__name__
+
+
+# ---------- backends ----------
+
+class LLMBackend:
+    name = "base"
+
+    def generate(self, prompt, timeout):
+        raise NotImplementedError
+
+    def stream(self, prompt, timeout):
+        yield self.generate(prompt, timeout)
+
+    async def agenerate(self, prompt, timeout):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate, prompt, timeout)
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, model_name=config.GEMINI_MODEL):
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout):
+        response = self._model.generate_content(
+            prompt,
+            generation_config=GENERATION_CONFIG,
+            request_options={"timeout": timeout},
+        )
+        return response.text
+
+    def stream(self, prompt, timeout):
+        response = self._model.generate_content(
+            prompt,
+            generation_config=GENERATION_CONFIG,
+            request_options={"timeout": timeout},
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def agenerate(self, prompt, timeout):
+        response = await self._model.generate_content_async(
+            prompt,
+            generation_config=GENERATION_CONFIG,
+            request_options={"timeout": timeout},
+        )
+        return response.text
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, model_name=config.OPENAI_MODEL, base_url=config.OPENAI_BASE_URL, api_key=None):
+        import openai
+
+        self.model_name = model_name
+        kwargs = {
+            "base_url": base_url,
+            "api_key": api_key or os.getenv("OPENAI_API_KEY") or "not-needed",
+            "max_retries": 0,  # LLMClient owns retries
+        }
+        # One client per process: its HTTP connection pool is reused across calls.
+        self._client = openai.OpenAI(**kwargs)
+        self._async_kwargs = kwargs
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI (connections are loop-bound)
+
+    def _request(self, prompt, **extra):
+        return dict(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=GENERATION_CONFIG["temperature"],
+            top_p=GENERATION_CONFIG["top_p"],
+            max_tokens=GENERATION_CONFIG["max_output_tokens"],
+            **extra,
+        )
+
+    def generate(self, prompt, timeout):
+        response = self._client.chat.completions.create(**self._request(prompt, timeout=timeout))
+        return response.choices[0].message.content or ""
+
+    def stream(self, prompt, timeout):
+        events = self._client.chat.completions.create(**self._request(prompt, timeout=timeout, stream=True))
+        for event in events:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+
+    async def agenerate(self, prompt, timeout):
+        import openai
+
+        client = loop_local(self._async_clients, lambda: openai.AsyncOpenAI(**self._async_kwargs))
+        response = await client.chat.completions.create(**self._request(prompt, timeout=timeout))
+        return response.choices[0].message.content or ""
+
+
+def stub_answer_tokens(prompt):
+    """Deterministic answer derived from the prompt, split into word tokens."""
+    query = prompt.rsplit("### User Query:", 1)[-1].split("### Your Answer:", 1)[0].strip()
+    answer = f"Stub answer to '{query}' based on {len(prompt)} prompt characters."
+    words = answer.split(" ")
+    return [words[0]] + [" " + w for w in words[1:]]
+
+
+class StubBackend(LLMBackend):
+    name = "stub"
+
+    def __init__(self, token_delay=config.STUB_TOKEN_DELAY):
+        self.token_delay = token_delay
+
+    def generate(self, prompt, timeout):
+        return "".join(self.stream(prompt, timeout))
+
+    def stream(self, prompt, timeout):
+        deadline = time.monotonic() + timeout
+        for token in stub_answer_tokens(prompt):
+            time.sleep(self.token_delay)
+            if time.monotonic() > deadline:
+                raise TimeoutError("stub backend timed out")
+            yield token
+
+    async def agenerate(self, prompt, timeout):
+        async def produce():
+            parts = []
+            for token in stub_answer_tokens(prompt):
+                await asyncio.sleep(self.token_delay)
+                parts.append(token)
+            return "".join(parts)
+        return await asyncio.wait_for(produce(), timeout)
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "openai": OpenAICompatibleBackend,
+    "stub": StubBackend,
+    "fake": StubBackend,  # older name of the stub
+}
+
+
+# ---------- latency statistics ----------
+
+class LatencyStats:
+    """Per-backend call latency (successful calls) and error/retry counters."""
+
+    def __init__(self, window=2048):
+        self._window = window
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def _entry(self, backend):
+        return self._data.setdefault(backend, {
+            "latencies": deque(maxlen=self._window),
+            "calls": 0, "errors": 0, "retries": 0, "hedges": 0,
+        })
+
+    def record(self, backend, seconds=None, error=False, retry=False, hedge=False):
+        with self._lock:
+            entry = self._entry(backend)
+            if seconds is not None:
+                entry["calls"] += 1
+                entry["latencies"].append(seconds)
+            entry["errors"] += int(error)
+            entry["retries"] += int(retry)
+            entry["hedges"] += int(hedge)
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for backend, entry in self._data.items():
+                lat = np.array(entry["latencies"]) * 1000
+                summary = {k: entry[k] for k in ("calls", "errors", "retries", "hedges")}
+                if len(lat):
+                    summary.update({
+                        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+                        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+                        "p99_ms": round(float(np.percentile(lat, 99)), 1),
+                        "mean_ms": round(float(lat.mean()), 1),
+                    })
+                out[backend] = summary
+            return out
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+latency_stats = LatencyStats()
+
+
+# ---------- resilient client ----------
+
+class LLMClient:
+    """
+    Wraps a backend with timeouts, retries and hedging.
+    Hedging: if an attempt has not finished after hedge_after seconds, a
+    second identical request is started and the first success wins.
+    """
+
+    def __init__(self, backend, timeout=config.LLM_TIMEOUT, max_retries=config.LLM_MAX_RETRIES,
+                 backoff_base=config.LLM_BACKOFF_BASE, hedge_after=config.LLM_HEDGE_AFTER):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hedge_after = hedge_after
+        self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix=f"llm-{backend.name}")
+
+    def _backoff(self, attempt):
+        # Exponential backoff with full jitter.
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def _timed_generate(self, prompt):
+        start = time.perf_counter()
+        answer = self.backend.generate(prompt, self.timeout)
+        latency_stats.record(self.backend.name, time.perf_counter() - start)
+        return answer
+
+    def _attempt(self, prompt):
+        primary = self._pool.submit(self._timed_generate, prompt)
+        futures = [primary]
+        if self.hedge_after:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                latency_stats.record(self.backend.name, hedge=True)
+                futures.append(self._pool.submit(self._timed_generate, prompt))
+
+        deadline = time.monotonic() + self.timeout
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"{self.backend.name} did not answer within {self.timeout}s")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def generate(self, prompt):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                latency_stats.record(self.backend.name, retry=True)
+                time.sleep(self._backoff(attempt - 1))
+            try:
+                return self._attempt(prompt)
+            except Exception as e:
+                last_error = e
+                latency_stats.record(self.backend.name, error=True)
+                print(f"⚠️ LLM backend '{self.backend.name}' attempt {attempt + 1} failed: {_describe(e)}")
+        raise LLMError(_describe(last_error)) from last_error
+
+    def stream(self, prompt):
+        """Stream tokens; an attempt is only retried if it failed before its first token."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                latency_stats.record(self.backend.name, retry=True)
+                time.sleep(self._backoff(attempt - 1))
+            started = False
+            start = time.perf_counter()
+            try:
+                for token in self.backend.stream(prompt, self.timeout):
+                    started = True
+                    yield token
+                latency_stats.record(self.backend.name, time.perf_counter() - start)
+                return
+            except Exception as e:
+                last_error = e
+                latency_stats.record(self.backend.name, error=True)
+                print(f"⚠️ LLM backend '{self.backend.name}' stream attempt {attempt + 1} failed: {_describe(e)}")
+                if started:
+                    break
+        raise LLMError(_describe(last_error)) from last_error
+
+    async def _atimed_generate(self, prompt):
+        start = time.perf_counter()
+        answer = await asyncio.wait_for(self.backend.agenerate(prompt, self.timeout), self.timeout)
+        latency_stats.record(self.backend.name, time.perf_counter() - start)
+        return answer
+
+    async def _aattempt(self, prompt):
+        tasks = [asyncio.ensure_future(self._atimed_generate(prompt))]
+        if self.hedge_after:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                latency_stats.record(self.backend.name, hedge=True)
+                tasks.append(asyncio.ensure_future(self._atimed_generate(prompt)))
+
+        pending, error = set(tasks), None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def agenerate(self, prompt):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                latency_stats.record(self.backend.name, retry=True)
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                return await self._aattempt(prompt)
+            except Exception as e:
+                last_error = e
+                latency_stats.record(self.backend.name, error=True)
+                print(f"⚠️ LLM backend '{self.backend.name}' attempt {attempt + 1} failed: {_describe(e)}")
+        raise LLMError(_describe(last_error)) from last_error
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(name=None):
+    """Process-wide LLMClient for a backend name (default: RAG_LLM_BACKEND)."""
+    name = name or config.LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}. Choose from {sorted(BACKENDS)}")
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = LLMClient(BACKENDS[name]())
+        return _clients[name]
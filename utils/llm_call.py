@@ -1,28 +1,65 @@
 # utils/llm_call.py
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+#
+# Entry points used by the agents. The actual provider is chosen with
+# RAG_LLM_BACKEND (see utils/llm_backends.py); failures are reported as an
+# "[ERROR calling <backend>]: ..." string, as before.
 
-load_dotenv()
+import time
 
-# Load Gemini API key from environment
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+from utils.llm_backends import GENERATION_CONFIG, LLMError, get_llm_client, latency_stats
 
-# Use Gemini Pro 2.0
-model = genai.GenerativeModel("gemini-2.0-flash")
+def _error(client, e):
+    return f"[ERROR calling {client.backend.name.capitalize()}]: {str(e)}"
 
-def call_llm_gemini(prompt: str) -> str:
+def call_llm(prompt: str, backend: str = None) -> str:
+    client = get_llm_client(backend)
+    try:
+        return client.generate(prompt)
+    except LLMError as e:
+        return _error(client, e)
+
+def call_llm_stream(prompt: str, backend: str = None, status: dict = None):
+    """
+    Yield response text piece by piece as it is generated. On failure the
+    error string is yielded last (possibly after partial text) and, if a
+    status dict is given, also stored in status["error"].
+    """
+    client = get_llm_client(backend)
+    try:
+        yield from client.stream(prompt)
+    except LLMError as e:
+        error = _error(client, e)
+        if status is not None:
+            status["error"] = error
+        yield error
+
+async def call_llm_async(prompt: str, backend: str = None) -> str:
+    client = get_llm_client(backend)
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.3,
-                "top_p": 0.95,
-                "top_k": 20,
-                "max_output_tokens": 1024,
-                "stop_sequences": None
-            }
-        )
-        return response.text
-    except Exception as e:
-        return f"[ERROR calling Gemini]: {str(e)}"
+        return await client.agenerate(prompt)
+    except LLMError as e:
+        return _error(client, e)
+
+def call_llm_gemini(prompt: str) -> str:
+    return call_llm(prompt, backend="gemini")
+
+def call_llm_gemini_stream(prompt: str):
+    return call_llm_stream(prompt, backend="gemini")
+
+def llm_latency_stats():
+    """Per-backend call latency percentiles and error/retry/hedge counts."""
+    return latency_stats.snapshot()
+
+def timed_stream(tokens, timings):
+    """
+    Pass tokens through, recording time to first token and total time
+    (seconds) into the timings dict.
+    """
+    start = time.perf_counter()
+    first = True
+    for token in tokens:
+        if first:
+            timings["ttft_s"] = time.perf_counter() - start
+            first = False
+        yield token
+    timings["total_s"] = time.perf_counter() - start
@@ -0,0 +1,68 @@
+# utils/manifest.py
+#
+# Ingestion manifest stored next to the FAISS index. For every indexed file it
+# records the content hash together with the chunker settings and embedding
+# model that produced its vectors, so unchanged files can be skipped.
+
+import hashlib
+import json
+import os
+
+from utils.config import INDEX_PATH, MANIFEST_PATH
+
+
+def file_sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    # A manifest without its index describes vectors that no longer exist.
+    if not os.path.exists(path) or not os.path.exists(INDEX_PATH):
+        return {"files": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fingerprint(file_path, chunker, embedding_model):
+    return {
+        "sha256": file_sha256(file_path),
+        "chunker": chunker,
+        "embedding_model": embedding_model,
+    }
+
+
+def file_status(manifest, file_path, current):
+    """
+    Compare a file's current fingerprint with the manifest entry.
+    Returns "new", "modified" or "unchanged".
+    """
+    entry = manifest["files"].get(os.path.abspath(file_path))
+    if entry is None:
+        return "new"
+    for key in ("sha256", "chunker", "embedding_model"):
+        if entry.get(key) != current[key]:
+            return "modified"
+    return "unchanged"
+
+
+def record_file(manifest, file_path, current, num_chunks):
+    manifest["files"][os.path.abspath(file_path)] = {
+        **current,
+        "source_file": os.path.basename(file_path),
+        "num_chunks": num_chunks,
+    }
+
+
+def forget_file(manifest, file_path):
+    return manifest["files"].pop(os.path.abspath(file_path), None)
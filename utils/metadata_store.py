@@ -0,0 +1,275 @@
+# utils/metadata_store.py
+#
+# Random-access chunk metadata keyed by FAISS vector id. Replaces the single
+# chunk_metadata.json list: looking up the top-k hits reads only k rows, and
+# appending a document writes only that document's rows.
+#
+# The indexed source_path column (the file's absolute path) doubles as the
+# document registry: which vector ids belong to which file, and in which index
+# shard they live. source_file is only the display name, and two uploads
+# with the same name in different directories are different documents.
+# Deleted ids are recorded as tombstones until their shard has physically
+# dropped them. doc_type and the page range are indexed columns too, so a
+# search filter resolves to the matching live ids with one query.
+
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from utils.config import CHUNK_STORE_PATH, METADATA_PATH
+
+_SQL_BATCH = 500
+_COLUMNS = ("chunk", "source_file", "doc_type", "page_start", "page_end", "source_path")
+_SELECT = "SELECT id, source_file, chunk, extra, doc_type, page_start, page_end, source_path FROM chunks"
+_FILTER_KEYS = ("source_file", "source_path", "doc_type", "page_range")
+
+
+def doc_type_of(source_file):
+    """Lower-case extension without the dot ("pdf"), or None."""
+    ext = os.path.splitext(source_file or "")[1]
+    return ext[1:].lower() or None
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+class MetadataStore:
+    def __init__(self, path=CHUNK_STORE_PATH, legacy_json_path=METADATA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id INTEGER PRIMARY KEY,"
+            " source_file TEXT,"
+            " chunk TEXT NOT NULL,"
+            " extra TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_source_file ON chunks(source_file)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tombstones (id INTEGER PRIMARY KEY)")
+        for table in ("chunks", "tombstones"):
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if "shard" not in columns:  # stores written before sharding are all shard 0
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN shard INTEGER NOT NULL DEFAULT 0")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")]
+        if "doc_type" not in columns:
+            for column in ("doc_type TEXT", "page_start INTEGER", "page_end INTEGER"):
+                self._conn.execute(f"ALTER TABLE chunks ADD COLUMN {column}")
+            self._backfill_filter_columns()
+        if "source_path" not in columns:  # older rows keep NULL and are keyed by source_file
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN source_path TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_type ON chunks(doc_type)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages ON chunks(page_start, page_end)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_source_path ON chunks(source_path)")
+        self._conn.commit()
+        if legacy_json_path and len(self) == 0 and os.path.exists(legacy_json_path):
+            self._migrate_json(legacy_json_path)
+
+    def _migrate_json(self, json_path):
+        with open(json_path, "r") as f:
+            records = json.load(f)
+        self.add(range(len(records)), records)
+        # Keep the file for reference, but never import it again once its documents are deleted
+        os.replace(json_path, json_path + ".migrated")
+        print(f"📥 Migrated {len(records)} chunk records from '{json_path}' (kept as '{json_path}.migrated')")
+
+    def _backfill_filter_columns(self):
+        # Rows written before filtering kept the page range in the extra JSON.
+        rows = self._conn.execute("SELECT id, source_file, extra FROM chunks").fetchall()
+        updates = []
+        for vector_id, source_file, extra in rows:
+            extra = json.loads(extra) if extra else {}
+            page_start, page_end = extra.pop("page_start", None), extra.pop("page_end", None)
+            updates.append((doc_type_of(source_file), page_start, page_end,
+                            json.dumps(extra) if extra else None, vector_id))
+        self._conn.executemany(
+            "UPDATE chunks SET doc_type = ?, page_start = ?, page_end = ?, extra = ? WHERE id = ?", updates
+        )
+        if updates:
+            print(f"🏷️ Indexed doc type and pages of {len(updates)} existing chunks for filtering")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    @staticmethod
+    def _to_row(vector_id, record):
+        extra = {k: v for k, v in record.items() if k not in _COLUMNS and k != "id"}
+        return (
+            int(vector_id),
+            record.get("source_file"),
+            record["chunk"],
+            json.dumps(extra) if extra else None,
+            record.get("doc_type") or doc_type_of(record.get("source_file")),
+            record.get("page_start"),
+            record.get("page_end"),
+            record.get("source_path"),
+        )
+
+    @staticmethod
+    def _from_row(row):
+        vector_id, source_file, chunk, extra, doc_type, page_start, page_end, source_path = row
+        record = {"id": vector_id, "chunk": chunk, "source_file": source_file, "doc_type": doc_type}
+        if page_start is not None:
+            record.update(page_start=page_start, page_end=page_end)
+        if source_path is not None:
+            record["source_path"] = source_path
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def add(self, ids, records, shard=0):
+        """Store one record per vector id. Existing ids are overwritten."""
+        rows = [self._to_row(i, r) + (shard,) for i, r in zip(ids, records)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks"
+                " (id, source_file, chunk, extra, doc_type, page_start, page_end, source_path, shard)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def get_many(self, ids):
+        """Return records for ids in the same order; missing ids give None."""
+        ids = [int(i) for i in ids]
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = ids[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                for row in self._conn.execute(
+                    f"{_SELECT} WHERE id IN ({marks})", batch
+                ):
+                    found[row[0]] = self._from_row(row)
+        return [found.get(i) for i in ids]
+
+    def ids_for_document(self, source_path):
+        """
+        {shard: [ids]} of the chunks of the file at source_path (absolute).
+        Rows written before paths were recorded match by file name.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT shard, id FROM chunks WHERE source_path = ?"
+                " UNION ALL SELECT shard, id FROM chunks WHERE source_path IS NULL AND source_file = ?"
+                " ORDER BY id",
+                (source_path, os.path.basename(source_path)),
+            ).fetchall()
+        by_shard = {}
+        for shard, vector_id in rows:
+            by_shard.setdefault(shard, []).append(vector_id)
+        return by_shard
+
+    @staticmethod
+    def _filter_clause(filters):
+        """
+        WHERE clause for a search filter dict with any of:
+          source_file  name or list of names
+          source_path  absolute path or list of them
+          doc_type     extension or list of them ("pdf", ["docx", "pptx"])
+          page_range   (first, last) pages, inclusive; chunks overlapping it
+                       match, chunks without page numbers do not
+        """
+        unknown = set(filters) - set(_FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown search filters: {sorted(unknown)}")
+        clauses, params = [], []
+        for column in ("source_file", "source_path", "doc_type"):
+            if filters.get(column) is not None:
+                values = _as_list(filters[column])
+                if column == "doc_type":
+                    values = [v.lower().lstrip(".") for v in values]
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        if filters.get("page_range") is not None:
+            first, last = filters["page_range"]
+            clauses.append("page_end >= ? AND page_start <= ?")
+            params.extend([int(first), int(last)])
+        return " AND ".join(clauses) or "1", params
+
+    def filter_ids(self, filters):
+        """{shard: sorted int64 array} of the live ids matching filters."""
+        where, params = self._filter_clause(filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT shard, id FROM chunks WHERE {where} ORDER BY shard, id", params
+            ).fetchall()
+        if not rows:
+            return {}
+        rows = np.asarray(rows, dtype="int64")
+        shards, starts = np.unique(rows[:, 0], return_index=True)
+        return {int(shard): ids for shard, ids in zip(shards, np.split(rows[:, 1], starts[1:]))}
+
+    def shards(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT DISTINCT shard FROM chunks")}
+
+    def documents(self):
+        """
+        Registry view: {source_path: {"source_file", "id_start", "id_end",
+        "num_chunks", "shard"}} (id_end inclusive). Rows from before paths
+        were recorded are keyed by source_file.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT COALESCE(source_path, source_file) AS doc, MIN(source_file), MIN(id), MAX(id), COUNT(*),"
+                " MIN(shard) FROM chunks GROUP BY doc"
+            ).fetchall()
+        return {
+            doc: {"source_file": source_file, "id_start": id_start, "id_end": id_end,
+                  "num_chunks": count, "shard": shard}
+            for doc, source_file, id_start, id_end, count, shard in rows
+        }
+
+    def max_id(self):
+        """Largest id ever handed out that is still referenced (live or tombstoned), or -1."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM chunks UNION ALL SELECT MAX(id) FROM tombstones)"
+            ).fetchone()
+        return row[0] if row[0] is not None else -1
+
+    def delete(self, ids, shard=0):
+        """Drop the records for ids and remember the ids as tombstones, atomically."""
+        ids = [int(i) for i in ids]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO tombstones (id, shard) VALUES (?, ?)", [(i, shard) for i in ids]
+                )
+
+    def tombstones(self, shard=0):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM tombstones WHERE shard = ?", (shard,))]
+
+    def clear_tombstones(self, ids):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM tombstones WHERE id = ?", [(int(i),) for i in ids])
+
+    def iter_range(self, start, end, batch_size=_SQL_BATCH, shard=None):
+        """Yield records with start <= id < end in id order, optionally of one shard only."""
+        last = start - 1
+        shard_clause = "" if shard is None else f" AND shard = {int(shard)}"
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"{_SELECT} WHERE id > ? AND id < ?{shard_clause} ORDER BY id LIMIT ?",
+                    (last, end, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._from_row(row)
+            last = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,95 @@
+# utils/semantic_cache.py
+#
+# Semantic answer cache for the LLMResponseAgent. An answer is reused when a
+# new question is close enough (cosine similarity) to a cached one AND was
+# answered over exactly the same retrieved context.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.config import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+
+
+def context_fingerprint(context_chunks, chunk_ids=None):
+    h = hashlib.sha256()
+    if chunk_ids is not None:
+        h.update(",".join(str(i) for i in sorted(chunk_ids)).encode("utf-8"))
+    for chunk in sorted(context_chunks):
+        h.update(b"\0")
+        h.update(chunk.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype="float32").ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    Bounded LRU of (query embedding, context fingerprint, answer) entries.
+    Candidates are first narrowed to the same fingerprint, so a lookup only
+    compares against questions asked over the same context.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, threshold=ANSWER_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # entry id -> (fingerprint, unit vector, answer)
+        self._by_fingerprint = {}  # fingerprint -> set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, query_embedding, fingerprint):
+        query = _unit(query_embedding)
+        with self._lock:
+            best_id, best_sim = None, self.threshold
+            for entry_id in self._by_fingerprint.get(fingerprint, ()):
+                sim = float(np.dot(query, self._entries[entry_id][1]))
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def store(self, query_embedding, fingerprint, answer):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (fingerprint, _unit(query_embedding), answer)
+            self._by_fingerprint.setdefault(fingerprint, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, (old_fp, _, _) = self._entries.popitem(last=False)
+                ids = self._by_fingerprint[old_fp]
+                ids.discard(old_id)
+                if not ids:
+                    del self._by_fingerprint[old_fp]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate(), 4),
+        }
@@ -0,0 +1,113 @@
+# utils/stub_llm_server.py
+#
+# Local OpenAI-compatible stub server (POST /v1/chat/completions, with and
+# without "stream": true). Answers come from stub_answer_tokens, so it can be
+# used to exercise the "openai" backend, pooling and hedging offline:
+#
+#   python -m utils.stub_llm_server --port 8088 --token-delay 0.02
+#   RAG_LLM_BACKEND=openai OPENAI_BASE_URL=http://127.0.0.1:8088/v1 streamlit run app.py
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.config import STUB_TOKEN_DELAY
+from utils.llm_backends import stub_answer_tokens
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pools are exercised
+    token_delay = STUB_TOKEN_DELAY
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        model = body.get("model", "stub")
+        tokens = stub_answer_tokens(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            time.sleep(self.token_delay * len(tokens))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(tokens),
+                          "total_tokens": len(prompt) // 4 + len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant"})
+        for token in tokens:
+            time.sleep(self.token_delay)
+            event({"content": token})
+        event({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_stub_server(host="127.0.0.1", port=0, token_delay=STUB_TOKEN_DELAY):
+    """Start the stub in a daemon thread. Returns (server, base_url)."""
+    handler = type("StubHandler", (_StubHandler,), {"token_delay": token_delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--token-delay", type=float, default=STUB_TOKEN_DELAY)
+    args = parser.parse_args()
+    server, url = start_stub_server(args.host, args.port, args.token_delay)
+    print(f"🤖 Stub LLM server listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
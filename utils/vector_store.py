@@ -0,0 +1,675 @@
+# utils/vector_store.py
+#
+# Long-lived, process-wide vector store shared by the IndexAgent and the
+# RetrievalAgent. The FAISS index is loaded once, kept in memory and only
+# reloaded when the file on disk changes underneath us (e.g. another process
+# indexed new documents). Chunk text lives in a MetadataStore keyed by
+# vector id and is fetched only for the hits. A BM25 inverted index over
+# the same ids is maintained alongside for lexical (exact-term) search.
+#
+# Vector ids are stable (IndexIDMap2), so a document can be deleted or
+# replaced without touching the others. Deleted ids are tombstoned and
+# excluded at search time with an IDSelector; compaction later drops them
+# from the index and the BM25 postings for good.
+#
+# The store is split into shards by size: each IndexShard has its own index,
+# BM25 and lock, so rewriting or searching one shard never waits on the
+# others. VectorStore fans searches out over the shards and merges the
+# per-shard top-k.
+
+import glob
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from itertools import chain
+
+import faiss
+import numpy as np
+
+from utils import config
+from utils.config import INDEX_PATH, CHUNK_STORE_PATH, BM25_PATH, FULL_VECTORS_PATH
+from utils.bm25_index import BM25Index
+from utils.cache import LRUCache
+from utils.concurrency import get_shard_executor
+from utils.metadata_store import MetadataStore
+from utils.full_vectors import FullVectorFile, rescore
+from utils.index_factory import (
+    build_from_vectors, configure_search, ids_of, index_type_of, is_id_mapped, search_params,
+    should_rebuild, storage_of, supports_remove, vectors_and_ids, with_ids,
+)
+
+
+def shard_path(path, shard):
+    """File of one shard. Shard 0 keeps the plain name, so a pre-sharding store is shard 0."""
+    if shard == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard}{ext}"
+
+
+def shard_index_files(index_path=INDEX_PATH):
+    """{shard number: path} of the shard index files that exist on disk."""
+    root, ext = os.path.splitext(index_path)
+    pattern = re.compile(re.escape(root) + r"\.shard(\d+)" + re.escape(ext) + "$")
+    found = {0: index_path} if os.path.exists(index_path) else {}
+    for path in glob.glob(glob.escape(root) + ".shard*" + ext):
+        match = pattern.match(path)
+        if match:
+            found[int(match.group(1))] = path
+    return dict(sorted(found.items()))
+
+
+class FilterMask:
+    """
+    The live ids matching one search filter, per shard, as a boolean bitmap
+    (for BM25 scoring) and a FAISS IDSelectorBitmap over the same bits.
+    Built once per filter and index generation, then shared by searches.
+    """
+
+    def __init__(self, ids_by_shard, filters=None, generation=None):
+        self.filters = filters
+        self.generation = generation  # VectorStore.generation the ids were read at
+        self.shards = {}  # shard number -> (mask, selector)
+        for shard, ids in ids_by_shard.items():
+            mask = np.zeros(int(ids[-1]) + 1, dtype=bool)
+            mask[ids] = True
+            packed = np.packbits(mask, bitorder="little")
+            selector = faiss.IDSelectorBitmap(packed)
+            selector.referenced_bitmap = packed  # the selector only holds a pointer
+            self.shards[shard] = (mask, selector)
+
+
+class ReadWriteLock:
+    """Many concurrent readers or a single writer."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class _Guard:
+    def __init__(self, acquire, release):
+        self._acquire, self._release = acquire, release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, *exc):
+        self._release()
+
+
+class IndexShard:
+    """
+    One FAISS index file with its BM25 index and exact-vector file, backed
+    by the shared chunk store. Readers search concurrently; writes take the
+    write lock only for the in-memory update and persist to disk afterwards.
+    """
+
+    def __init__(self, shard, metadata, index_path=INDEX_PATH, bm25_path=BM25_PATH, full_vectors_path=FULL_VECTORS_PATH):
+        self.shard = shard
+        self.index_path = shard_path(index_path, shard)
+        self.index = None
+        self.metadata = metadata
+        self.bm25_path = shard_path(bm25_path, shard)
+        self.bm25 = BM25Index(self.bm25_path)
+        # Exact copies for re-scoring quantized search results (RAG_QUANT_RESCORE)
+        self.full_vectors = FullVectorFile(shard_path(full_vectors_path, shard)) if config.QUANT_RESCORE else None
+        self.generation = 0  # bumped on every load or write
+        self._id_bound = 0  # one past the largest id in this shard
+        self._tombstones = set()
+        self._exclude = None  # IDSelector hiding the tombstones, None if there are none
+        self._loaded_version = None
+        self._rw = ReadWriteLock()
+        self._writer_mutex = threading.Lock()
+
+    def read_locked(self):
+        return _Guard(self._rw.acquire_read, self._rw.release_read)
+
+    def write_locked(self):
+        return _Guard(self._rw.acquire_write, self._rw.release_write)
+
+    # ---------- disk sync ----------
+
+    def _disk_version(self):
+        # Metadata rows and the BM25 file are written before the index file is
+        # replaced, so the index file alone tells us whether anything changed.
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Reload from disk if the on-disk files differ from what is in memory."""
+        version = self._disk_version()
+        if version == self._loaded_version:
+            return False
+        with self._writer_mutex:
+            version = self._disk_version()
+            if version == self._loaded_version:
+                return False
+            index = None
+            if version is not None:
+                index = configure_search(faiss.read_index(self.index_path))
+            migrated = index is not None and not is_id_mapped(index)
+            if migrated:
+                index = self._with_stable_ids(index)
+            bm25 = BM25Index.load(self.bm25_path)
+            if index is not None and index.ntotal and not bm25.num_docs:
+                bm25 = self._rebuild_bm25()
+            with self.write_locked():
+                self.index = index
+                self.bm25 = bm25
+                self._set_tombstones(self.metadata.tombstones(self.shard))
+                self._id_bound = int(ids_of(index).max()) + 1 if index is not None and index.ntotal else 0
+                self._loaded_version = version
+                self.generation += 1
+            if migrated:
+                self._persist()
+            print(f"📂 Shard {self.shard} loaded {self.ntotal} vectors from disk")
+            return True
+
+    def _with_stable_ids(self, index):
+        # Index written before ids were stable: vector i keeps id i.
+        vectors, ids = vectors_and_ids(index)
+        print(f"🆔 Moving {len(ids)} vectors to an id-mapped {index_type_of(index)} index")
+        return build_from_vectors(index_type_of(index), vectors, storage=storage_of(index), ids=ids)
+
+    def _rebuild_bm25(self):
+        # Index written before lexical search existed: backfill from the chunk store.
+        bm25 = BM25Index(self.bm25_path)
+        ids, texts = [], []
+        for record in self.metadata.iter_range(0, self.metadata.max_id() + 1, shard=self.shard):
+            ids.append(record["id"])
+            texts.append(record["chunk"])
+        bm25.add(ids, texts)
+        bm25.save()
+        print(f"🔤 Built BM25 index for {len(ids)} existing chunks of shard {self.shard}")
+        return bm25
+
+    def _set_tombstones(self, ids):
+        # Caller holds the write lock (or is the only user of the store).
+        self._tombstones = set(ids)
+        if not self._tombstones:
+            self._exclude = None
+            return
+        batch = faiss.IDSelectorBatch(np.fromiter(self._tombstones, dtype="int64"))
+        self._exclude = faiss.IDSelectorNot(batch)
+        self._exclude.referenced_batch = batch  # IDSelectorNot does not own it
+
+    def _vectors_for_rebuild(self):
+        """(vectors, ids) of the live vectors, exact copies preferred over decoded ones."""
+        with self.read_locked():
+            vectors, ids = vectors_and_ids(self.index)
+        live = ~np.isin(ids, np.fromiter(self._tombstones, dtype="int64"))
+        vectors, ids = vectors[live], ids[live]
+        if self.full_vectors is not None and len(ids) and self.full_vectors.covers(self._id_bound, self.index.d):
+            vectors = np.array(self.full_vectors.matrix(self.index.d)[ids])
+        return vectors, ids
+
+    def _rebuild_live(self, index_type, storage):
+        vectors, ids = self._vectors_for_rebuild()
+        if not len(ids):
+            return with_ids(faiss.IndexFlatL2(self.index.d))
+        return build_from_vectors(index_type, vectors, storage=storage, ids=ids)
+
+    def _maybe_rebuild(self):
+        """
+        Swap the flat index for the configured ANN index once it is large
+        enough, or for the configured storage precision (RAG_VECTOR_STORAGE).
+        Caller must hold the writer mutex.
+        """
+        target = should_rebuild(self.index)
+        if target is None:
+            return False
+        before = f"{index_type_of(self.index)}/{storage_of(self.index)}"
+        rebuilt = self._rebuild_live(*target)
+        with self.write_locked():
+            self.index = rebuilt
+            self._set_tombstones(())  # the rebuild left the deleted vectors out
+            self.bm25.compact()
+            self.generation += 1
+        print(f"🚀 Rebuilt shard {self.shard} {before} → {index_type_of(rebuilt)}/{storage_of(rebuilt)} at {rebuilt.ntotal} vectors")
+        return True
+
+    def _compact(self):
+        """
+        Physically drop tombstoned vectors and postings. Flat indexes remove
+        them in place; HNSW and IVF are rebuilt from the live vectors.
+        Caller must hold the writer mutex.
+        """
+        dead = np.fromiter(self._tombstones, dtype="int64")
+        if supports_remove(self.index):
+            with self.write_locked():
+                self.index.remove_ids(faiss.IDSelectorBatch(dead))
+        else:
+            rebuilt = self._rebuild_live(index_type_of(self.index), storage_of(self.index))
+            with self.write_locked():
+                self.index = rebuilt
+        with self.write_locked():
+            self._set_tombstones(())
+            self.bm25.compact()
+            self.generation += 1
+        print(f"🧹 Compacted shard {self.shard}: dropped {len(dead)} deleted vectors, {self.index.ntotal} remain")
+
+    def _write_full_vectors(self, ids, embeddings):
+        if self.index is not None and self.index.ntotal and not self.full_vectors.covers(self._id_bound, self.index.d):
+            # Re-scoring was switched on for an existing index: backfill the
+            # exact copies, which is only possible while it is still float32.
+            if storage_of(self.index) != "float32":
+                print("⚠️ No exact vectors for the existing quantized index; re-scoring stays off until it is rebuilt")
+                return
+            with self.read_locked():
+                existing, existing_ids = vectors_and_ids(self.index)
+            self.full_vectors.write_at(existing_ids, existing)
+        self.full_vectors.write_at(ids, embeddings)
+
+    def _persist(self):
+        self.bm25.save()
+        tmp_index = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_index)
+        os.replace(tmp_index, self.index_path)
+        self._loaded_version = self._disk_version()
+
+    # ---------- public API ----------
+
+    @property
+    def ntotal(self):
+        """Vectors held by the index, including deleted ones awaiting compaction."""
+        return self.index.ntotal if self.index is not None else 0
+
+    @property
+    def live_count(self):
+        return self.ntotal - len(self._tombstones)
+
+    @property
+    def dim(self):
+        return self.index.d if self.index is not None else None
+
+    def write(self, ids=(), embeddings=None, records=(), delete_ids=()):
+        """
+        Delete delete_ids and add records under ids (one embedding row each)
+        in a single persisted update. Returns the number of ids deleted.
+        """
+        records, delete_ids = list(records), list(delete_ids)
+        if records:
+            embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+            if not len(embeddings) == len(records) == len(ids):
+                raise ValueError("ids, embeddings and records must have the same length")
+        self.refresh()
+        with self._writer_mutex:
+            removed = self._delete_locked(delete_ids) if delete_ids else 0
+            if not records and not removed:
+                return 0
+            if records:
+                self._add_locked(np.asarray(ids, dtype="int64"), embeddings, records)
+
+            dead = list(self._tombstones)
+            if self._maybe_rebuild():
+                compacted = True
+            elif dead and len(dead) >= config.COMPACT_RATIO * self.ntotal:
+                self._compact()
+                compacted = True
+            else:
+                compacted = False
+            # Serialising only reads the index, so searches can continue meanwhile.
+            with self.read_locked():
+                self._persist()
+            if compacted and dead:
+                self.metadata.clear_tombstones(dead)
+            return removed
+
+    def compact(self):
+        """Drop deleted vectors now instead of waiting for RAG_COMPACT_RATIO."""
+        self.refresh()
+        with self._writer_mutex:
+            if not self._tombstones:
+                return 0
+            dead = list(self._tombstones)
+            self._compact()
+            with self.read_locked():
+                self._persist()
+            self.metadata.clear_tombstones(dead)
+            return len(dead)
+
+    def _delete_locked(self, ids):
+        texts = [r["chunk"] if r else "" for r in self.metadata.get_many(ids)]
+        with self.write_locked():
+            # Rows and in-memory tombstones change together, so no reader sees a
+            # live id without its record; the SQLite tombstones survive a crash.
+            self.metadata.delete(ids, shard=self.shard)
+            self.bm25.remove(ids, texts)
+            self._set_tombstones(self._tombstones | set(ids))
+            self.generation += 1
+        return len(ids)
+
+    def _add_locked(self, ids, embeddings, records):
+        self.metadata.add(ids, records, shard=self.shard)
+        if self.full_vectors is not None:
+            self._write_full_vectors(ids, embeddings)
+        with self.write_locked():
+            if self.index is None:
+                self.index = with_ids(faiss.IndexFlatL2(embeddings.shape[1]))
+                print(f"📦 Created new FAISS index for shard {self.shard}")
+            self.index.add_with_ids(embeddings, ids)
+            self.bm25.add(ids, [r["chunk"] for r in records])
+            self._id_bound = max(self._id_bound, int(ids.max()) + 1)
+            self.generation += 1
+
+    def search_ids(self, query_vectors, k, selector=None):
+        """
+        Return, per query row, a list of (distance, vector id) pairs.
+        selector: optional IDSelector of live ids; FAISS only visits those.
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype="float32")
+        self.refresh()
+        with self.read_locked():
+            if self.index is None or self.index.ntotal == 0:
+                return [[] for _ in range(len(query_vectors))]
+            full = self._rescore_matrix()
+            fetch = k * config.RESCORE_FACTOR if full is not None else k
+            # Filtered ids come from the chunk store, which holds no tombstoned ids.
+            selector = selector if selector is not None else self._exclude
+            params = search_params(self.index, selector) if selector is not None else None
+            distances, indices = self.index.search(query_vectors, fetch, params=params)
+        if full is not None:
+            distances, indices = rescore(query_vectors, indices, lambda ids: full[ids], k)
+        return [
+            [(float(d), int(i)) for d, i in zip(row_d, row_i) if i >= 0]
+            for row_d, row_i in zip(distances, indices)
+        ]
+
+    def _rescore_matrix(self):
+        # Only worth it for quantized storage, and only if every vector has an exact copy.
+        if self.full_vectors is None or storage_of(self.index) == "float32":
+            return None
+        if not self.full_vectors.covers(self._id_bound, self.index.d):
+            return None
+        return self.full_vectors.matrix(self.index.d)
+
+    def term_stats(self, query):
+        self.refresh()
+        with self.read_locked():
+            return self.bm25.term_stats(query)
+
+    def search_lexical(self, query, k, stats=None, mask=None):
+        """Return up to k (bm25 score, vector id) pairs for a query string."""
+        self.refresh()
+        with self.read_locked():
+            return self.bm25.search(query, k, stats, mask)
+
+
+class VectorStore:
+    """
+    All index shards plus the shared chunk store. New documents go to the
+    newest shard until it reaches RAG_SHARD_MAX_VECTORS; searches run on
+    every shard (or only those holding chunks that match the filters) in
+    parallel and the per-shard top-k lists are merged with a heap.
+    """
+
+    def __init__(self, index_path=INDEX_PATH, chunk_store_path=CHUNK_STORE_PATH, bm25_path=BM25_PATH,
+                 full_vectors_path=FULL_VECTORS_PATH, shard_max_vectors=None):
+        self.index_path = index_path
+        self.bm25_path = bm25_path
+        self.full_vectors_path = full_vectors_path
+        self.metadata = MetadataStore(chunk_store_path)
+        self.shard_max_vectors = shard_max_vectors or config.SHARD_MAX_VECTORS
+        self.shards = {}  # shard number -> IndexShard
+        self._lock = threading.Lock()  # shard set and id allocation
+        self._next_id = None  # next unused vector id, shared by all shards
+        self._discovered_at = 0.0
+        self._filter_cache = LRUCache(config.FILTER_CACHE_SIZE)  # (filters, generation) -> FilterMask
+
+    # ---------- shards ----------
+
+    def _get_shard(self, number):
+        # Caller holds self._lock.
+        shard = self.shards.get(number)
+        if shard is None:
+            shard = self.shards[number] = IndexShard(
+                number, self.metadata, self.index_path, self.bm25_path, self.full_vectors_path
+            )
+        return shard
+
+    def _discover(self, force=False):
+        """Pick up shard files created by other processes (at most once a second)."""
+        now = time.monotonic()
+        if not force and now - self._discovered_at < 1.0:
+            return
+        numbers = {0} | set(self.metadata.shards()) | set(shard_index_files(self.index_path))
+        with self._lock:
+            for number in numbers:
+                self._get_shard(number)
+            self._discovered_at = now
+
+    def _shard_list(self):
+        self._discover()
+        with self._lock:
+            return [self.shards[n] for n in sorted(self.shards)]
+
+    def resolve_filters(self, filters):
+        """
+        FilterMask for a filter dict, looked up in the chunk store only the
+        first time it is used at the current index generation. Searches
+        accept the result in place of the dict, so a batch resolves once;
+        a FilterMask from an older generation is resolved again.
+        """
+        if not filters:
+            return None
+        for shard in self._shard_list():
+            shard.refresh()
+        generation = self.generation
+        if isinstance(filters, FilterMask):
+            if filters.generation == generation:
+                return filters
+            filters = filters.filters
+        key = (json.dumps(filters, sort_keys=True), generation)
+        resolved = self._filter_cache.get(key)
+        if resolved is None:
+            resolved = FilterMask(self.metadata.filter_ids(filters), filters, generation)
+            self._filter_cache.put(key, resolved)
+        return resolved
+
+    def _targets(self, filters):
+        """[(shard, (mask, selector) or None)] to search; shards without a match are skipped."""
+        shards = self._shard_list()
+        if not filters:
+            return [(shard, (None, None)) for shard in shards]
+        resolved = self.resolve_filters(filters).shards
+        return [(shard, resolved[shard.shard]) for shard in shards if shard.shard in resolved]
+
+    def _fan_out(self, fn, items):
+        # FAISS releases the GIL while searching, so shards run truly in parallel.
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(get_shard_executor().map(fn, items))
+
+    def _allocate(self, count):
+        """Ids for count new vectors and the shard that should take them."""
+        self._discover(force=True)
+        for shard in self._shard_list():
+            shard.refresh()
+        with self._lock:
+            # Never reuse an id that the chunk store, a tombstone or any shard still knows,
+            # including ids another process allocated since our last write.
+            bounds = [self.metadata.max_id() + 1] + [s._id_bound for s in self.shards.values()]
+            self._next_id = max(bounds + [self._next_id or 0])
+            ids = np.arange(self._next_id, self._next_id + count, dtype="int64")
+            self._next_id += count
+            newest = self._get_shard(max(self.shards))
+            if newest.ntotal and newest.ntotal + count > self.shard_max_vectors:
+                newest = self._get_shard(newest.shard + 1)
+                print(f"🧩 Started index shard {newest.shard}")
+        return ids, newest
+
+    # ---------- properties ----------
+
+    def refresh(self):
+        """Reload any shard whose files changed on disk."""
+        self._discover()
+        changed = False
+        for shard in self._shard_list():
+            changed = shard.refresh() or changed
+        return changed
+
+    @property
+    def generation(self):
+        # Every shard's generation only grows, and shards are never dropped.
+        shards = list(self.shards.values())
+        return sum(s.generation for s in shards) + len(shards)
+
+    @property
+    def ntotal(self):
+        return sum(s.ntotal for s in list(self.shards.values()))
+
+    @property
+    def live_count(self):
+        return sum(s.live_count for s in list(self.shards.values()))
+
+    @property
+    def dim(self):
+        return next((s.dim for s in self._shard_list() if s.dim is not None), None)
+
+    def documents(self):
+        """Registry of indexed documents: {source_path: {"source_file", "id_start", "id_end", "num_chunks", "shard"}}."""
+        return self.metadata.documents()
+
+    # ---------- writes ----------
+
+    def add(self, embeddings, records):
+        """Append vectors with one metadata record per row and persist them."""
+        records = list(records)
+        if not records:
+            return
+        ids, shard = self._allocate(len(records))
+        shard.write(ids, embeddings, records)
+
+    def delete_document(self, file_path):
+        """Remove every chunk of the file at file_path. Returns the number of chunks removed."""
+        removed = 0
+        for number, ids in self.metadata.ids_for_document(os.path.abspath(file_path)).items():
+            with self._lock:
+                shard = self._get_shard(number)
+            removed += shard.write(delete_ids=ids)
+        if removed:
+            print(f"🗑️ Removed {removed} chunks of '{os.path.basename(file_path)}'")
+        return removed
+
+    def replace_document(self, file_path, embeddings, records):
+        """
+        Swap the chunks of the file at file_path for new ones. Documents are
+        keyed by absolute path, so same-named files in different directories
+        never replace each other. Within one shard this is a single write, so
+        readers see either the old or the new version; if the old chunks live
+        in another shard they are deleted right after the new ones are added.
+        Returns the number of old chunks removed.
+        """
+        source_path = os.path.abspath(file_path)
+        records = [{**record, "source_path": source_path} for record in records]
+        old = self.metadata.ids_for_document(source_path)
+        ids, target = self._allocate(len(records))
+        removed = target.write(ids, embeddings, records, delete_ids=old.pop(target.shard, ()))
+        for number, old_ids in old.items():
+            with self._lock:
+                shard = self._get_shard(number)
+            removed += shard.write(delete_ids=old_ids)
+        if removed:
+            print(f"🗑️ Removed {removed} old chunks of '{os.path.basename(file_path)}'")
+        return removed
+
+    def compact(self):
+        """Drop deleted vectors from every shard now. Returns the number dropped."""
+        return sum(shard.compact() for shard in self._shard_list())
+
+    # ---------- search ----------
+
+    def search_ids(self, query_vectors, k, filters=None):
+        """
+        Return, per query row, a list of (distance, vector id) pairs.
+        filters: optional {"source_file", "source_path", "doc_type", "page_range"}
+        dict (see MetadataStore._filter_clause) or its resolve_filters()
+        result, applied as an IDSelector inside FAISS.
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype="float32")
+        per_shard = self._fan_out(lambda target: target[0].search_ids(query_vectors, k, target[1][1]),
+                                  self._targets(filters))
+        return [
+            heapq.nsmallest(k, chain.from_iterable(rows), key=lambda hit: hit[0])
+            for rows in zip(*per_shard)
+        ] if per_shard else [[] for _ in range(len(query_vectors))]
+
+    def search_lexical(self, query, k, filters=None):
+        """Return up to k (bm25 score, vector id) pairs for a query string."""
+        shards = self._shard_list()
+        # IDF and average length over the whole collection keep shard scores comparable.
+        num_docs, total_len, dfs = 0, 0.0, {}
+        for shard_docs, shard_len, shard_dfs in (s.term_stats(query) for s in shards):
+            num_docs += shard_docs
+            total_len += shard_len
+            for term, df in shard_dfs.items():
+                dfs[term] = dfs.get(term, 0) + df
+        stats = (num_docs, total_len, dfs)
+        per_shard = self._fan_out(lambda target: target[0].search_lexical(query, k, stats, target[1][0]),
+                                  self._targets(filters))
+        return heapq.nlargest(k, chain.from_iterable(per_shard), key=lambda hit: hit[0])
+
+    def get_records(self, ids):
+        return self.metadata.get_many(ids)
+
+    def search(self, query_vectors, k, filters=None):
+        """
+        Return, per query row, a list of up to k (distance, record) pairs.
+        Ids deleted between the index search and the record lookup are
+        backfilled by searching again with a larger k.
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype="float32")
+        results = [[] for _ in range(len(query_vectors))]
+        pending, fetch = list(range(len(query_vectors))), k
+        while pending:
+            rows = self.search_ids(query_vectors[pending], fetch, self.resolve_filters(filters))
+            short = []
+            for row, hits in zip(pending, rows):
+                records = self.get_records([i for _, i in hits])
+                results[row] = [(d, r) for (d, _), r in zip(hits, records) if r is not None][:k]
+                if len(results[row]) < k and len(hits) == fetch:
+                    short.append(row)
+            pending, fetch = short, fetch * 2
+        return results
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_vector_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore()
+    return _store
@@ -0,0 +1,77 @@
+# utils/warmup.py
+#
+# Nothing heavy is loaded at import time any more: the SentenceTransformer,
+# the FAISS index, the tiktoken encoder and the LLM SDK are all created on
+# first use. warm_up() triggers those first uses ahead of time, optionally
+# in a background thread, so the first question does not pay for them.
+
+import threading
+import time
+
+from utils.config import WARMUP
+
+warmup_timings = {}  # step -> seconds, filled in as the warm-up progresses
+_started = False
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def _step(name, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        print(f"⚠️ Warm-up step '{name}' failed: {e}")
+        return
+    warmup_timings[name] = time.perf_counter() - start
+
+
+def _load_embedding_model():
+    from utils.embedding import get_embeddings
+    get_embeddings(["warm-up"])  # the first encode also initialises the tokenizer
+
+
+def _load_vector_store():
+    from utils.vector_store import get_vector_store
+    get_vector_store().refresh()
+
+
+def _load_tokenizer():
+    from utils.chunking import count_tokens
+    count_tokens("warm-up")
+
+
+def _load_llm_client():
+    from utils.llm_backends import get_llm_client
+    get_llm_client()
+
+
+def _run(llm=True):
+    start = time.perf_counter()
+    _step("embedding_model", _load_embedding_model)
+    _step("vector_store", _load_vector_store)
+    _step("tokenizer", _load_tokenizer)
+    if llm:
+        _step("llm_client", _load_llm_client)
+    warmup_timings["total"] = time.perf_counter() - start
+    print("🔥 Warm-up finished:", {k: round(v, 3) for k, v in warmup_timings.items()})
+
+
+def warm_up(background=True, llm=True):
+    """
+    Load the lazily-initialised resources now. With background=True this
+    returns the (daemon) warm-up thread immediately; calling it again while
+    or after it runs is a no-op. Respects RAG_WARMUP=0.
+    """
+    global _started, _warmup_thread
+    if not WARMUP:
+        return None
+    with _warmup_lock:
+        if _started:
+            return _warmup_thread
+        _started = True
+        if background:
+            _warmup_thread = threading.Thread(target=_run, args=(llm,), name="rag-warmup", daemon=True)
+            _warmup_thread.start()
+            return _warmup_thread
+    _run(llm)
+    return None